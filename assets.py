@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from markupsafe import Markup, escape
+from werkzeug.exceptions import NotFound
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+RESIZABLE = {'.png', '.jpg', '.jpeg'}
+WEBP_WIDTHS = (480, 960, 1600)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Served in order of preference when the client accepts them
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+bp = Blueprint('assets', __name__)
+
+
+def _fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def _hashed_name(logical, digest, suffix=None):
+    stem, ext = os.path.splitext(logical)
+    return f"{stem}.{digest}{suffix or ext}"
+
+
+def _compress(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gz)
+        written.append(path + '.gz')
+    try:
+        import brotli
+    except ImportError:
+        return written
+    br = brotli.compress(data, quality=11)
+    if len(br) < len(data):
+        with open(path + '.br', 'wb') as f:
+            f.write(br)
+        written.append(path + '.br')
+    return written
+
+
+def _webp_variants(source, output_dir, logical, digest, widths, quality):
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning(f"Pillow is not installed; skipping WebP variants of {logical}")
+        return {}
+    variants = {}
+    with Image.open(source) as image:
+        # Always emit one variant at the original width so large screens get WebP too
+        targets = sorted({w for w in widths if w < image.width} | {min(image.width, max(widths))})
+        for width in targets:
+            height = round(image.height * width / image.width)
+            name = _hashed_name(logical, digest, f'.{width}w.webp')
+            resized = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB').resize(
+                (width, height), Image.LANCZOS)
+            resized.save(os.path.join(output_dir, name), 'WEBP', quality=quality, method=6)
+            variants[width] = name
+    return variants
+
+
+def build_assets(static_dir, widths=WEBP_WIDTHS, webp_quality=80):
+    """Fingerprint everything under ``static_dir`` into ``static_dir/dist`` and write a manifest.
+
+    Text assets also get .gz/.br siblings and raster images get resized WebP
+    variants. The previous build is replaced, so the manifest and the files
+    on disk always agree.
+    """
+    output_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != output_dir)
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            digest = _fingerprint(source)
+            hashed = _hashed_name(logical, digest)
+            target = os.path.join(output_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+
+            entry = {'file': hashed, 'size': os.path.getsize(source)}
+            ext = os.path.splitext(filename)[1].lower()
+            if ext in COMPRESSIBLE:
+                entry['encodings'] = [os.path.splitext(path)[1][1:] for path in _compress(target)]
+            if ext in RESIZABLE:
+                variants = _webp_variants(source, output_dir, logical, digest, widths, webp_quality)
+                if variants:
+                    entry['webp'] = variants
+            manifest[logical] = entry
+
+    with open(os.path.join(output_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url_for(endpoint, **values):
+    """Template ``url_for`` that points static files at their fingerprinted build output when there is one."""
+    if endpoint == 'static':
+        entry = current_app.extensions['assets'].get(values.get('filename'))
+        if entry:
+            values['filename'] = entry['file']
+            endpoint = 'assets.asset'
+    return url_for(endpoint, **values)
+
+
+def asset_srcset(filename):
+    """``srcset`` value listing the WebP variants of an image, or an empty string before a build."""
+    entry = current_app.extensions['assets'].get(filename) or {}
+    return Markup(', '.join(
+        f"{escape(url_for('assets.asset', filename=name))} {width}w"
+        for width, name in sorted(entry.get('webp', {}).items(), key=lambda item: int(item[0]))
+    ))
+
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    directory = os.path.join(current_app.static_folder, DIST_DIR)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding]:
+            try:
+                response = send_from_directory(directory, filename + suffix, mimetype=mimetype, max_age=31536000)
+            except NotFound:
+                continue
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, max_age=31536000)
+    # The name changes whenever the content does, so the file never needs revalidating
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app):
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.register_blueprint(bp)
+    app.jinja_env.globals['url_for'] = asset_url_for
+    app.jinja_env.globals['asset_srcset'] = asset_srcset
@@ -0,0 +1,75 @@
+import re
+
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DEFAULT_WEEKDAYS = [0, 1, 2, 3, 4]
+
+ALIASES = {
+    'weekdays': DEFAULT_WEEKDAYS,
+    'weekday': DEFAULT_WEEKDAYS,
+    'weekends': [5, 6],
+    'weekend': [5, 6],
+    'daily': list(range(7)),
+    'everyday': list(range(7)),
+    'every day': list(range(7)),
+    'all days': list(range(7)),
+    'all week': list(range(7)),
+}
+
+# Opening hours such as "9-5", "9am - 5pm", "09:00 to 17:30" or a lone "10am"; removed before days are read
+TIME = r'\d{1,2}(?:[:.]\d{2})?\s*(?:[ap]\.?m\.?|hrs|h)?'
+TIME_RANGE = re.compile(rf'(?<![\w:]){TIME}(?:\s*(?:-|–|\bto\b)\s*{TIME})?(?![\w:])')
+RANGE_SEPARATOR = re.compile(r'\s*(?:-|–|\bto\b)\s*')
+LIST_SEPARATOR = re.compile(r'[,/;&]|\band\b')
+NOISE = re.compile(r'[():.]|\b(?:from|between|only)\b')
+
+
+def _weekday(word):
+    """Weekday number for "mon", "tues", "wednesday" or "fridays", or None for anything else."""
+    word = word.strip().lower()
+    if word.endswith('s') and word[:-1] in WEEKDAY_NAMES:
+        word = word[:-1]
+    if len(word) < 3:
+        return None
+    for index, name in enumerate(WEEKDAY_NAMES):
+        if name.startswith(word):
+            return index
+    return None
+
+
+def parse_available_days(text):
+    """Turn free text such as "Mon-Fri", "Mon, Wed & Fri 9-5" or "Weekends" into sorted weekday numbers (Mon=0).
+
+    Times of day are ignored. Text with any part that is not a day, a range
+    of days or one of the ALIASES gives an empty list rather than a guess.
+    """
+    days = set()
+    cleaned = NOISE.sub(' ', TIME_RANGE.sub(' ', (text or '').lower()))
+    for part in LIST_SEPARATOR.split(cleaned):
+        part = ' '.join(part.split())
+        if not part:
+            continue
+        if part in ALIASES:
+            days.update(ALIASES[part])
+            continue
+
+        bounds = RANGE_SEPARATOR.split(part)
+        if len(bounds) == 2:
+            start, end = _weekday(bounds[0]), _weekday(bounds[1])
+            if start is None or end is None:
+                return []
+            # Ranges may wrap around the week, e.g. "Fri-Mon"
+            day = start
+            days.add(day)
+            while day != end:
+                day = (day + 1) % 7
+                days.add(day)
+            continue
+        if len(bounds) > 2:
+            return []
+
+        for word in part.split():
+            day = _weekday(word)
+            if day is None:
+                return []
+            days.add(day)
+    return sorted(days)
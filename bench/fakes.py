@@ -0,0 +1,56 @@
+"""Local stand-ins for Gemini, the translator and Twilio with configurable latency."""
+import os
+import time
+
+import services
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Answers every prompt with the same reply after ``latency`` seconds.
+
+    Streaming calls wait ``latency`` before the first chunk and
+    ``chunk_latency`` between the rest, like a real token stream.
+    """
+
+    def __init__(self, latency=0.8, chunk_latency=0.05, reply=None):
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.reply = reply or ('Staying hydrated and eating small, regular meals can help. '
+                               'Please check with your doctor before changing your diet or medication.')
+
+    def generate_content(self, contents, stream=False):
+        time.sleep(self.latency)
+        if not stream:
+            return FakeResponse(self.reply)
+        return self._stream()
+
+    def _stream(self):
+        words = self.reply.split(' ')
+        for start in range(0, len(words), 4):
+            if start:
+                time.sleep(self.chunk_latency)
+            yield FakeResponse(' '.join(words[start:start + 4]) + ' ')
+
+
+class FakeTranslatorClient:
+    def __init__(self, latency=0.15):
+        self.latency = latency
+
+    def translate(self, text):
+        time.sleep(self.latency)
+        return text
+
+
+def install_fakes(gemini_latency=0.8, translator_latency=0.15, sms_latency=0.2):
+    """Point the app's shared clients at the fakes; call before the first request."""
+    services._clients['gemini'] = FakeGeminiModel(latency=gemini_latency)
+    translator_client = FakeTranslatorClient(latency=translator_latency)
+    services.translator._client = lambda source_language, target_language: translator_client
+    # get_sms_sender() builds a sms.FakeSender from these
+    os.environ['SMS_BACKEND'] = 'fake'
+    os.environ['FAKE_SMS_LATENCY'] = str(sms_latency)
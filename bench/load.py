@@ -0,0 +1,279 @@
+"""Drive the real routes at fixed concurrency levels and report latency percentiles and throughput.
+
+    DATABASE_URL=sqlite:///bench.db python bench/seed.py --reset
+    DATABASE_URL=sqlite:///bench.db python bench/load.py --concurrency 1,8,32 --duration 30
+    DATABASE_URL=sqlite:///bench.db python bench/load.py --compare bench/results/load-<timestamp>.json
+
+The app is built in this process with Gemini, the translator and Twilio
+replaced by the fakes in bench/fakes.py, and served by a threaded WSGI
+server on a local port. Each virtual user keeps a logged-in patient and
+doctor session and runs a weighted mix of scenarios. Results are written to
+bench/results/load-<timestamp>.json; with --compare, p95 latencies are
+checked against an earlier run and the exit status is 1 on a regression.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import create_app  # noqa: E402
+from fakes import install_fakes  # noqa: E402
+from models import db, User, Doctor  # noqa: E402
+from seed import PASSWORD, doctor_email, patient_email  # noqa: E402
+from slots import day_slots, format_slot  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'results')
+DEFAULT_MIX = 'login=1,doctors=3,book=1,chat=2,patient_dashboard=3,doctor_dashboard=1'
+QUESTIONS = [
+    'Is it safe to drink coffee while pregnant?', 'What should I eat in the first trimester?',
+    'How much water should I drink every day?', 'Can I exercise during pregnancy?',
+    'What are the signs of preterm labour?', 'How can I sleep better in the third trimester?',
+]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Client:
+    """A browser-like session against the server: keeps cookies and does not follow redirects."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect)
+
+    def request(self, method, path, form=None, json_body=None):
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def login(self, email, user_type):
+        return self.request('POST', '/login', form={'email': email, 'password': PASSWORD, 'user_type': user_type})
+
+
+class VirtualUser:
+    def __init__(self, base_url, population, rng):
+        self.base_url = base_url
+        self.population = population
+        self.rng = rng
+        self.patient = Client(base_url)
+        self.patient.login(patient_email(rng.randint(1, population['users'])), 'patient')
+        self.doctor = Client(base_url)
+        self.doctor.login(doctor_email(rng.randint(1, population['doctors'])), 'doctor')
+
+    def login(self):
+        # A fresh session each time so the full password check is measured
+        return Client(self.base_url).login(patient_email(self.rng.randint(1, self.population['users'])), 'patient')
+
+    def doctors(self):
+        return self.patient.request('GET', '/doctors')
+
+    def book(self):
+        doctor_id = self.rng.randint(1, self.population['doctors'])
+        day = date.today() + timedelta(days=self.rng.randint(1, 28))
+        return self.patient.request('POST', f'/book_appointment/{doctor_id}', form={
+            'date': day.isoformat(), 'time': format_slot(self.rng.choice(day_slots()))})
+
+    def chat(self):
+        return self.patient.request('POST', '/api/chat', json_body={
+            'message': self.rng.choice(QUESTIONS), 'language': self.rng.choice(['en', 'en', 'en', 'hi'])})
+
+    def patient_dashboard(self):
+        return self.patient.request('GET', '/patient_dashboard')
+
+    def doctor_dashboard(self):
+        return self.doctor.request('GET', '/doctor_dashboard')
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if not hasattr(VirtualUser, name.strip()):
+            raise SystemExit(f'Unknown scenario "{name}"')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))]
+
+
+def summarise(samples, elapsed):
+    latencies = sorted(latency for latency, status in samples)
+    errors = sum(1 for latency, status in samples if status is None or status >= 500)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+    }
+
+
+def run_level(base_url, population, mix, concurrency, duration, seed):
+    samples = {name: [] for name in mix}
+    lock = threading.Lock()
+    window = {}
+
+    def start_clock():
+        window['started'] = time.perf_counter()
+        window['deadline'] = window['started'] + duration
+
+    # Logins happen before the barrier; the clock starts once every user is ready
+    ready = threading.Barrier(concurrency + 1, action=start_clock)
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        user = VirtualUser(base_url, population, rng)
+        names, weights = list(mix), list(mix.values())
+        ready.wait()
+        while time.perf_counter() < window['deadline']:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = getattr(user, name)()
+            except Exception:
+                status = None
+            latency = time.perf_counter() - started
+            with lock:
+                samples[name].append((latency, status))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - window['started']
+
+    report = {'concurrency': concurrency, 'duration_s': round(elapsed, 2)}
+    report['scenarios'] = {name: summarise(values, elapsed) for name, values in samples.items()}
+    report['overall'] = summarise([s for values in samples.values() for s in values], elapsed)
+    return report
+
+
+def print_level(level):
+    print(f"\nconcurrency {level['concurrency']} ({level['duration_s']}s)")
+    print(f"  {'scenario':<18} {'reqs':>7} {'errs':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, s in list(level['scenarios'].items()) + [('overall', level['overall'])]:
+        print(f"  {name:<18} {s['requests']:>7} {s['errors']:>5} {s['throughput_rps']:>8} "
+              f"{s['p50_ms'] or '-':>8} {s['p95_ms'] or '-':>8} {s['p99_ms'] or '-':>8}")
+
+
+def compare(report, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(level['concurrency'], name): s
+                for level in baseline['levels'] for name, s in level['scenarios'].items()}
+    regressions = []
+    print(f'\nCompared with {baseline_path} ({baseline.get("git_rev", "unknown")}):')
+    for level in report['levels']:
+        for name, s in level['scenarios'].items():
+            old = previous.get((level['concurrency'], name))
+            if not old or not old['p95_ms'] or not s['p95_ms']:
+                continue
+            change = (s['p95_ms'] - old['p95_ms']) / old['p95_ms']
+            flag = '  REGRESSION' if change > tolerance else ''
+            print(f"  c={level['concurrency']:<4} {name:<18} p95 {old['p95_ms']:>8} -> {s['p95_ms']:>8} ms "
+                  f"({change:+.0%}){flag}")
+            if flag:
+                regressions.append((level['concurrency'], name))
+    return regressions
+
+
+def git_rev():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run each level')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario weights, e.g. "doctors=3,chat=1"')
+    parser.add_argument('--gemini-latency', type=float, default=0.8)
+    parser.add_argument('--translator-latency', type=float, default=0.15)
+    parser.add_argument('--sms-latency', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--compare', metavar='RESULTS_JSON', help='earlier results to check p95 against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 increase before flagging')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    install_fakes(args.gemini_latency, args.translator_latency, args.sms_latency)
+    app = create_app()
+    with app.app_context():
+        population = {'users': db.session.query(User).count(), 'doctors': db.session.query(Doctor).count()}
+    if not population['users'] or not population['doctors']:
+        raise SystemExit('The database is empty; run bench/seed.py first')
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_rev': git_rev(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'],
+        'population': population,
+        'mix': mix,
+        'fakes': {'gemini_latency': args.gemini_latency, 'translator_latency': args.translator_latency,
+                  'sms_latency': args.sms_latency},
+        'levels': [],
+    }
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(',')]:
+            level = run_level(base_url, population, mix, concurrency, args.duration, args.seed)
+            report['levels'].append(level)
+            print_level(level)
+    finally:
+        server.shutdown()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nSaved {path}')
+
+    if args.compare and compare(report, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
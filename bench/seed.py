@@ -0,0 +1,146 @@
+"""Seed a benchmark database with realistic volumes.
+
+    DATABASE_URL=sqlite:///bench.db python bench/seed.py --reset
+    DATABASE_URL=sqlite:///bench.db python bench/seed.py --reset --users 1000 --doctors 50 --appointments 10000
+
+The schema is dropped and recreated, so the script only runs with --reset
+and a DATABASE_URL set in the environment that is not the app's default
+database; a URL that only comes from .env is not enough. Every seeded account uses the password
+"benchmark"; patients are patient<N>@bench.shewell and doctors
+doctor<N>@bench.shewell, numbered from 1 to match their ids. Appointments
+are spread over the past ``--past-days`` and next ``--future-days`` days on
+each doctor's working days, leaving most future slots free for bookings.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from database import DEFAULT_DATABASE_URL  # noqa: E402
+from availability import parse_available_days  # noqa: E402
+from doctor_directory import directory  # noqa: E402
+from models import db, User, Doctor, DoctorAvailability, Appointment  # noqa: E402
+from passwords import hasher  # noqa: E402
+from slots import day_slots, format_slot  # noqa: E402
+
+PASSWORD = 'benchmark'
+SPECIALIZATIONS = ['Obstetrics', 'Gynecology', 'Fertility', 'Maternal-Fetal Medicine', 'Lactation', 'Nutrition',
+                   'Mental Health', 'Endocrinology']
+DAY_PATTERNS = ['Mon-Fri', 'Mon-Sat', 'Mon, Wed, Fri', 'Tue, Thu, Sat', 'Mon-Sun']
+FIRST_NAMES = ['Aisha', 'Priya', 'Meera', 'Sara', 'Fatima', 'Anjali', 'Kavya', 'Nisha', 'Riya', 'Zoya', 'Asha', 'Divya']
+LAST_NAMES = ['Sharma', 'Khan', 'Patel', 'Iyer', 'Reddy', 'Das', 'Singh', 'Gupta', 'Nair', 'Bose', 'Mehta', 'Rao']
+
+
+def patient_email(n):
+    return f'patient{n}@bench.shewell'
+
+
+def doctor_email(n):
+    return f'doctor{n}@bench.shewell'
+
+
+def _insert(model, rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(db.insert(model), rows[start:start + chunk_size])
+    db.session.commit()
+
+
+def _name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def seed(users, doctors, appointments, past_days=180, future_days=30, seed=42, chunk_size=10000):
+    rng = random.Random(seed)
+    # One hash for everyone: seeding should not spend minutes in scrypt
+    password_hash = hasher.hash(PASSWORD)
+    db.drop_all()
+    db.create_all()
+
+    _insert(User, [
+        {'id': n, 'email': patient_email(n), 'password_hash': password_hash, 'name': _name(rng),
+         'phone': f'+9190000{n:05d}'[:15]}
+        for n in range(1, users + 1)
+    ], chunk_size)
+
+    doctor_rows, availability_rows, weekdays_by_doctor = [], [], {}
+    for n in range(1, doctors + 1):
+        pattern = rng.choice(DAY_PATTERNS)
+        weekdays_by_doctor[n] = set(parse_available_days(pattern))
+        doctor_rows.append({
+            'id': n, 'email': doctor_email(n), 'password_hash': password_hash, 'name': _name(rng),
+            'specialization': rng.choice(SPECIALIZATIONS), 'experience': rng.randint(1, 35),
+            'phone': f'+9180000{n:05d}'[:15], 'available_days': pattern,
+            'per_minute_price': round(rng.uniform(5, 60), 1),
+        })
+        availability_rows.extend({'weekday': weekday, 'doctor_id': n} for weekday in weekdays_by_doctor[n])
+    _insert(Doctor, doctor_rows, chunk_size)
+    _insert(DoctorAvailability, availability_rows, chunk_size)
+
+    today = date.today()
+    calendar = [today + timedelta(days=offset) for offset in range(-past_days, future_days)]
+    slots = day_slots()
+    per_doctor, remainder = divmod(appointments, doctors) if doctors else (0, 0)
+    batch, created = [], 0
+    for n in range(1, doctors + 1):
+        days = [day for day in calendar if day.weekday() in weekdays_by_doctor[n]]
+        quota = min(per_doctor + (1 if n <= remainder else 0), len(days) * len(slots))
+        # Sampling positions in the (day, slot) grid keeps each doctor's bookings unique
+        for position in rng.sample(range(len(days) * len(slots)), quota):
+            day, slot = days[position // len(slots)], slots[position % len(slots)]
+            if day >= today:
+                status = 'scheduled'
+            else:
+                status = rng.choices(['completed', 'cancelled'], weights=[9, 1])[0]
+            batch.append({
+                'user_id': rng.randint(1, users), 'doctor_id': n, 'date': day, 'time': format_slot(slot),
+                'slot': None if status == 'cancelled' else slot, 'status': status,
+            })
+            if len(batch) >= chunk_size:
+                db.session.execute(db.insert(Appointment), batch)
+                created += len(batch)
+                batch = []
+    if batch:
+        db.session.execute(db.insert(Appointment), batch)
+        created += len(batch)
+    db.session.commit()
+    # Bulk inserts bypass the session events that maintain the directory read model
+    directory.rebuild()
+    return {'users': users, 'doctors': doctors, 'appointments': created}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--doctors', type=int, default=5000)
+    parser.add_argument('--appointments', type=int, default=1000000)
+    parser.add_argument('--past-days', type=int, default=180)
+    parser.add_argument('--future-days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='confirm that the target database may be wiped')
+    args = parser.parse_args()
+
+    # Checked before create_app() loads .env, which may point at a real database
+    url = os.environ.get('DATABASE_URL')
+    if not url or url == DEFAULT_DATABASE_URL:
+        raise SystemExit('Refusing to seed: set DATABASE_URL to a dedicated benchmark database, '
+                         f'not the default {DEFAULT_DATABASE_URL}')
+    if not args.reset:
+        raise SystemExit(f'Seeding drops every table in {url}; pass --reset to confirm')
+
+    app = create_app()
+    started = time.perf_counter()
+    with app.app_context():
+        print(f"Seeding {app.config['SQLALCHEMY_DATABASE_URI']}")
+        counts = seed(args.users, args.doctors, args.appointments, args.past_days, args.future_days, args.seed)
+    print(f"Seeded {counts['users']} users, {counts['doctors']} doctors and {counts['appointments']} appointments "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
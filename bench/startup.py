@@ -0,0 +1,92 @@
+"""Measure worker start-up cost: time to import the app and build it, and peak RSS.
+
+    python bench/startup.py                    # current tree
+    python bench/startup.py --against f5d8aa7  # also measure a git ref, for a before/after
+
+Each sample runs in a fresh interpreter. Results are printed and written to
+bench/results/startup-<timestamp>.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'bench', 'results')
+
+HEAVY_MODULES = ['google.generativeai', 'twilio.rest', 'deep_translator']
+
+# Runs inside the child interpreter; works for trees with or without create_app()
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+application = app.create_app() if hasattr(app, 'create_app') else app.app
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'heavy_modules': [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def sample(tree, runs):
+    results = []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONWARNINGS='ignore')
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=tree, env=env,
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'runs': runs,
+        'median_seconds': statistics.median(r['seconds'] for r in results),
+        'median_max_rss_kb': statistics.median(r['max_rss_kb'] for r in results),
+        'modules': results[-1]['modules'],
+        'heavy_modules': results[-1]['heavy_modules'],
+    }
+
+
+def sample_ref(ref, runs):
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, 'tree')
+        subprocess.run(['git', 'worktree', 'add', '--detach', tree, ref], cwd=ROOT, check=True, capture_output=True)
+        try:
+            return sample(tree, runs)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', tree], cwd=ROOT, check=True, capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--against', metavar='REF', help='git ref to measure for comparison')
+    args = parser.parse_args()
+
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'current': sample(ROOT, args.runs)}
+    if args.against:
+        report['baseline_ref'] = args.against
+        report['baseline'] = sample_ref(args.against, args.runs)
+
+    for label in ('baseline', 'current'):
+        if label in report:
+            r = report[label]
+            print(f"{label:>8}: {r['median_seconds'] * 1000:7.1f} ms  {r['median_max_rss_kb'] / 1024:6.1f} MiB RSS  "
+                  f"{r['modules']} modules  heavy={','.join(r['heavy_modules']) or '-'}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved {path}')
+
+
+if __name__ == '__main__':
+    main()
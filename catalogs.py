@@ -0,0 +1,226 @@
+import ast
+import logging
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g, has_request_context, request
+from markupsafe import escape
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = 'en'
+# The languages offered by the chatbot; English is the source language
+LANGUAGES = {
+    'en': 'English', 'hi': 'हिन्दी', 'bn': 'বাংলা', 'ta': 'தமிழ்', 'te': 'తెలుగు',
+    'mr': 'मराठी', 'gu': 'ગુજરાતી', 'pa': 'ਪੰਜਾਬੀ', 'ml': 'മലയാളം', 'kn': 'ಕನ್ನಡ',
+}
+CATALOG_DIR = 'translations'
+# Python files whose N_()/gettext() strings are extracted alongside the templates
+PYTHON_SOURCES = ('views.py',)
+MARKERS = {'_', 'N_', 'gettext'}
+
+MO_MAGIC = 0x950412de
+
+
+def N_(message):
+    """Mark a string for extraction without translating it here."""
+    return message
+
+
+def _encode(message):
+    # Plural entries are keyed by (singular, plural) and hold one translation per form, joined by NULs
+    if isinstance(message, str):
+        return message.encode('utf-8')
+    return '\0'.join(message).encode('utf-8')
+
+
+def write_mo(path, messages):
+    """Write ``messages`` (source -> translation) as a GNU .mo file, atomically.
+
+    Sources are plain strings, ``context + '\x04' + source`` for entries with
+    a context as gettext stores them, or ``(singular, plural)`` tuples whose
+    translation is a sequence of plural forms.
+    """
+    entries = {b'': f'Content-Type: text/plain; charset=UTF-8\nLanguage: {os.path.basename(path)[:-3]}\n'.encode()}
+    entries.update((_encode(source), _encode(translated)) for source, translated in messages.items())
+    # Readers binary-search the sources, so they are sorted as bytes
+    keys = sorted(entries)
+    ids = strs = b''
+    offsets = []
+    for source in keys:
+        translated = entries[source]
+        offsets.append((len(ids), len(source), len(strs), len(translated)))
+        ids += source + b'\0'
+        strs += translated + b'\0'
+    # Header, then the source and translation tables of (length, offset) pairs, then the strings
+    key_start = 7 * 4 + 16 * len(keys)
+    value_start = key_start + len(ids)
+    table = []
+    for source_offset, source_length, _, _ in offsets:
+        table += [source_length, source_offset + key_start]
+    for _, _, value_offset, value_length in offsets:
+        table += [value_length, value_offset + value_start]
+    header = struct.pack('<7I', MO_MAGIC, 0, len(keys), 7 * 4, 7 * 4 + 8 * len(keys), 0, 0)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header + struct.pack(f'<{len(table)}I', *table) + ids + strs)
+    os.replace(tmp_path, path)
+
+
+def read_mo(path):
+    """Read a catalog written by write_mo, in the same shape it was given."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, _, count, sources, translations = struct.unpack_from('<5I', data)
+    if magic != MO_MAGIC:
+        raise ValueError(f'{path} is not a little-endian .mo file')
+    catalog = {}
+    for i in range(count):
+        source_length, source_offset = struct.unpack_from('<2I', data, sources + 8 * i)
+        value_length, value_offset = struct.unpack_from('<2I', data, translations + 8 * i)
+        source = data[source_offset:source_offset + source_length].decode('utf-8')
+        translated = data[value_offset:value_offset + value_length].decode('utf-8')
+        if '\0' in source:
+            catalog[tuple(source.split('\0'))] = tuple(translated.split('\0'))
+        elif source:
+            catalog[source] = translated
+    return catalog
+
+
+class Catalogs:
+    """Compiled translations, each locale read from disk the first time it is asked for."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._catalogs = {}
+        self._lock = threading.Lock()
+
+    def path(self, locale):
+        return os.path.join(self.directory, f'{locale}.mo')
+
+    def get(self, locale):
+        catalog = self._catalogs.get(locale)
+        if catalog is not None:
+            return catalog
+        with self._lock:
+            if locale not in self._catalogs:
+                try:
+                    self._catalogs[locale] = read_mo(self.path(locale))
+                except FileNotFoundError:
+                    self._catalogs[locale] = {}
+                except (OSError, ValueError, struct.error) as e:
+                    logger.error(f"Could not load the {locale} catalog: {e}")
+                    self._catalogs[locale] = {}
+            return self._catalogs[locale]
+
+    def lookup(self, message, locale):
+        """The compiled translation of ``message``, or None if there isn't one."""
+        # Unknown locales are never looked up on disk; they can come straight from a request
+        if locale == DEFAULT_LOCALE or locale not in LANGUAGES:
+            return None
+        return self.get(locale).get(message)
+
+    def gettext(self, message, locale):
+        return self.lookup(message, locale) or message
+
+    def clear(self):
+        with self._lock:
+            self._catalogs.clear()
+
+
+def current_locale():
+    """The page locale, chosen with ?lang= so cached pages are keyed by it too."""
+    if not has_request_context():
+        return DEFAULT_LOCALE
+    if 'locale' not in g:
+        locale = request.args.get('lang', DEFAULT_LOCALE)
+        g.locale = locale if locale in LANGUAGES else DEFAULT_LOCALE
+    return g.locale
+
+
+def gettext(message, locale=None):
+    return current_app.extensions['catalogs'].gettext(message, locale or current_locale())
+
+
+def lookup(message, locale):
+    return current_app.extensions['catalogs'].lookup(message, locale)
+
+
+def ngettext(singular, plural, n):
+    return gettext(singular if n == 1 else plural)
+
+
+# Jinja marks what these return as safe, and machine translations are not trusted markup
+def _template_gettext(message):
+    return escape(gettext(message))
+
+
+def _template_ngettext(singular, plural, n):
+    return escape(ngettext(singular, plural, n))
+
+
+def _python_messages(path):
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in MARKERS
+                and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            yield node.args[0].value
+
+
+def extract_messages(app):
+    """Every marked string in the templates and PYTHON_SOURCES, in first-seen order."""
+    messages = {}
+    env = app.jinja_env
+    for name in sorted(env.list_templates(extensions=['html'])):
+        source = env.loader.get_source(env, name)[0]
+        for _, _, message in env.extract_translations(source):
+            if isinstance(message, str):
+                messages.setdefault(message, None)
+            else:
+                # ngettext gives a tuple of the singular and plural forms
+                messages.update((form, None) for form in message if isinstance(form, str))
+    for filename in PYTHON_SOURCES:
+        for message in _python_messages(os.path.join(app.root_path, filename)):
+            messages.setdefault(message, None)
+    return list(messages)
+
+
+def build_catalogs(app, translate, languages=None, force=False, workers=4, progress=None):
+    """Translate the extracted messages once per language and write the compiled catalogs.
+
+    Translations already in a catalog are kept, so a rebuild only sends new
+    messages to ``translate(text, target_language)``. Strings that come back
+    unchanged are left out so the next build retries them; until then the
+    page shows English. Returns {locale: (translated, missing)}.
+    """
+    catalogs = app.extensions['catalogs']
+    os.makedirs(catalogs.directory, exist_ok=True)
+    messages = extract_messages(app)
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for locale in languages or [code for code in LANGUAGES if code != DEFAULT_LOCALE]:
+            existing = {} if force or not os.path.exists(catalogs.path(locale)) else read_mo(catalogs.path(locale))
+            catalog = {message: existing[message] for message in messages if message in existing}
+            pending = [message for message in messages if message not in catalog]
+            for message, translated in zip(pending, pool.map(lambda text: translate(text, locale), pending)):
+                if translated and translated != message:
+                    catalog[message] = translated
+            write_mo(catalogs.path(locale), catalog)
+            results[locale] = (len(catalog), len(messages) - len(catalog))
+            if progress:
+                progress(locale, *results[locale])
+    catalogs.clear()
+    return results
+
+
+def init_catalogs(app):
+    app.extensions['catalogs'] = Catalogs(os.path.join(app.root_path, CATALOG_DIR))
+    app.jinja_env.add_extension('jinja2.ext.i18n')
+    app.jinja_env.install_gettext_callables(_template_gettext, _template_ngettext, newstyle=True)
+
+    @app.context_processor
+    def locale_context():
+        return {'locale': current_locale(), 'languages': LANGUAGES}
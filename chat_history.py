@@ -0,0 +1,172 @@
+import atexit
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db, ChatHistory
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text, which is what Gemini sees
+    return len(text) // 4 + 1
+
+
+class ChatHistoryBuffer:
+    """Write-behind buffer that persists chat turns in batches from a background thread.
+
+    A batch that fails is put back and retried on the next flush, up to
+    ``max_retries`` times; after that its rows are written one at a time and
+    any row that still fails is logged and dropped, so a single bad turn
+    cannot hold up the rest of the buffer.
+    """
+
+    def __init__(self, app=None, flush_size=50, flush_interval=2.0, max_pending=10000, max_retries=3):
+        self.app = app
+        self.configure(flush_size, flush_interval, max_retries)
+        self._retries = 0
+        self._pending = deque(maxlen=max_pending)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def configure(self, flush_size=50, flush_interval=2.0, max_retries=3):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+    def record(self, user_id, message, response):
+        if self.app is None:
+            # The flush thread needs the application to open its own app context
+            self.app = current_app._get_current_object()
+        self._pending.append({
+            'user_id': user_id,
+            'message': message,
+            'response': response,
+            'timestamp': datetime.utcnow(),
+        })
+        self._ensure_worker()
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='chat-history-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        batch = []
+        while self._pending and len(batch) < self.flush_size * 10:
+            batch.append(self._pending.popleft())
+        if not batch:
+            return 0
+
+        with self.app.app_context():
+            try:
+                db.session.execute(db.insert(ChatHistory), batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to write {len(batch)} chat turns: {e}")
+                if self._retries < self.max_retries:
+                    self._retries += 1
+                    # Keep the turns for the next attempt unless newer ones have filled the buffer
+                    self._pending.extendleft(reversed(batch))
+                    return 0
+                self._retries = 0
+                return self._write_rows(batch)
+        self._retries = 0
+        return len(batch)
+
+    def _write_rows(self, batch):
+        """Insert ``batch`` row by row, dropping the rows that fail on their own."""
+        written = 0
+        for row in batch:
+            try:
+                db.session.execute(db.insert(ChatHistory), [row])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Dropping chat turn for user {row['user_id']} from {row['timestamp']}: {e}")
+            else:
+                written += 1
+        return written
+
+
+class ConversationContext:
+    """Per-user cache of recent turns, trimmed to a token budget before being sent to Gemini.
+
+    Only turns from the last ``max_age`` seconds count as context, so a
+    patient coming back later starts a fresh conversation whose opening
+    question can be answered from the shared response cache.
+    """
+
+    def __init__(self, token_budget=2000, max_turns=20, max_users=5000, max_age=30 * 60):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self.configure(token_budget, max_turns, max_age)
+
+    def configure(self, token_budget=2000, max_turns=20, max_age=30 * 60):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.max_age = max_age
+        # Cached turns are bounded by max_turns, so start over
+        with self._lock:
+            self._turns = OrderedDict()
+
+    def _cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.max_age)
+
+    def _load(self, user_id):
+        rows = (ChatHistory.query
+                .filter(ChatHistory.user_id == user_id, ChatHistory.timestamp >= self._cutoff())
+                .order_by(ChatHistory.timestamp.desc())
+                .limit(self.max_turns)
+                .all())
+        return deque(((row.message, row.response, row.timestamp) for row in reversed(rows)), maxlen=self.max_turns)
+
+    def _user_turns(self, user_id):
+        with self._lock:
+            turns = self._turns.get(user_id)
+            if turns is not None:
+                self._turns.move_to_end(user_id)
+                return turns
+        turns = self._load(user_id)
+        with self._lock:
+            turns = self._turns.setdefault(user_id, turns)
+            while len(self._turns) > self.max_users:
+                self._turns.popitem(last=False)
+        return turns
+
+    def add_turn(self, user_id, message, response):
+        self._user_turns(user_id).append((message, response, datetime.utcnow()))
+
+    def build(self, user_id, prompt):
+        """Return Gemini ``contents`` for ``prompt`` preceded by as much recent history as fits the budget."""
+        budget = self.token_budget - estimate_tokens(prompt)
+        cutoff = self._cutoff()
+        history = []
+        for message, response, timestamp in reversed(list(self._user_turns(user_id))):
+            cost = estimate_tokens(message) + estimate_tokens(response)
+            if timestamp < cutoff or cost > budget:
+                break
+            budget -= cost
+            history[:0] = [
+                {'role': 'user', 'parts': [message]},
+                {'role': 'model', 'parts': [response]},
+            ]
+        return history + [{'role': 'user', 'parts': [prompt]}]
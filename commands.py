@@ -0,0 +1,181 @@
+import csv
+import logging
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from assets import build_assets
+from catalogs import DEFAULT_LOCALE, LANGUAGES, build_catalogs
+from cycles import refresh_predictions
+from doctor_directory import directory
+from doctor_import import DoctorImporter, ImportFormatError, detect_format, iter_records
+from exports import appointment_rows, chat_history_rows, encode
+from models import db, PeriodLog
+from reminders import ReminderScheduler
+from services import get_sms_sender, translator
+from sms import SmsDispatcher
+
+
+@click.command('sms-dispatch')
+@click.option('--once', is_flag=True, help='Exit once the outbox has nothing due.')
+@click.option('--batch-size', default=50, show_default=True)
+@with_appcontext
+def sms_dispatch(once, batch_size):
+    """Send queued SMS messages from the outbox."""
+    sender = get_sms_sender()
+    if sender is None:
+        raise click.ClickException('No SMS backend configured; set the TWILIO_* variables or SMS_BACKEND=fake')
+    logging.basicConfig(level=logging.INFO)
+    dispatcher = SmsDispatcher(
+        sender,
+        batch_size=batch_size,
+        max_attempts=int(os.getenv('SMS_MAX_ATTEMPTS', 5)),
+        rate_per_second=float(os.getenv('SMS_RATE_PER_SECOND', 10)),
+        lease=int(os.getenv('SMS_LEASE_SECONDS', 300))
+    )
+    dispatcher.run(once=once)
+
+
+@click.command('reminders-run')
+@click.option('--once', is_flag=True, help='Process one batch and exit.')
+@click.option('--window', default=300, show_default=True, help='Seconds ahead of now to pick up due reminders.')
+@click.option('--interval', default=60, show_default=True, help='Seconds to sleep between idle polls.')
+@with_appcontext
+def reminders_run(once, window, interval):
+    """Queue due appointment reminders and complete past appointments."""
+    logging.basicConfig(level=logging.INFO)
+    ReminderScheduler(window=window).run(interval=interval, once=once)
+
+
+@click.command('assets-build')
+@click.option('--webp-quality', default=80, show_default=True)
+@with_appcontext
+def assets_build(webp_quality):
+    """Fingerprint, precompress and resize static assets into static/dist."""
+    manifest = build_assets(current_app.static_folder, webp_quality=webp_quality)
+    for logical, entry in sorted(manifest.items()):
+        extras = entry.get('encodings', []) + [f'{width}w.webp' for width in entry.get('webp', {})]
+        click.echo(f"{logical} -> {entry['file']}" + (f" (+{', '.join(extras)})" if extras else ''))
+    # Running workers only read the manifest at start-up
+    click.echo(f'Built {len(manifest)} assets; restart the app to serve them.')
+
+
+@click.command('doctors-import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False, writable=True),
+              help='Write every rejected row to this CSV file.')
+@with_appcontext
+def doctors_import(source, fmt, batch_size, errors_path):
+    """Bulk-create doctors from a CSV or JSONL file (use - for stdin)."""
+    fmt = fmt or detect_format(source.name)
+    try:
+        size = os.fstat(source.fileno()).st_size if source.seekable() else None
+    except (OSError, ValueError):
+        size = None
+    importer = DoctorImporter(batch_size=batch_size, max_errors=None if errors_path else 1000)
+    try:
+        for report in importer.iter_batches(iter_records(source, fmt)):
+            done = f' ({source.tell() / size:.0%})' if size else ''
+            click.echo(f"Processed {report.processed} rows{done}: {report.created} created, "
+                       f"{report.duplicates} duplicates, {report.failed} failed", err=True)
+    except ImportFormatError as e:
+        raise click.ClickException(str(e))
+
+    if errors_path:
+        with open(errors_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['line', 'email', 'error'])
+            writer.writeheader()
+            writer.writerows(report.errors)
+        click.echo(f'Wrote {len(report.errors)} rejected rows to {errors_path}', err=True)
+    else:
+        for error in report.errors[:20]:
+            click.echo(f"  line {error['line']} {error['email'] or ''}: {error['error']}", err=True)
+
+
+@click.group('export')
+def export():
+    """Stream appointments or chat history to CSV or JSONL."""
+
+
+def _export_options(command):
+    command = click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)(command)
+    command = click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day to include.')(command)
+    command = click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last day to include.')(command)
+    command = click.option('--output', '-o', type=click.File('w'), default='-', help='Defaults to stdout.')(command)
+    return command
+
+
+def _write(result, fmt, output):
+    for chunk in encode(result, fmt):
+        output.write(chunk)
+
+
+@export.command('appointments')
+@_export_options
+@click.option('--doctor-id', type=int)
+@with_appcontext
+def export_appointments(fmt, start, end, output, doctor_id):
+    """Export appointments, optionally for one doctor."""
+    _write(appointment_rows(doctor_id, start and start.date(), end and end.date()), fmt, output)
+
+
+@export.command('chat-history')
+@_export_options
+@click.option('--user-id', type=int)
+@with_appcontext
+def export_chat_history(fmt, start, end, output, user_id):
+    """Export chat turns, optionally for one patient."""
+    _write(chat_history_rows(user_id, start and start.date(), end and end.date()), fmt, output)
+
+
+@click.command('cycles-predict')
+@click.option('--all', 'everyone', is_flag=True, help='Recompute every user, not just stale or outdated predictions.')
+@click.option('--batch-size', default=2000, show_default=True)
+@with_appcontext
+def cycles_predict(everyone, batch_size):
+    """Recompute cycle predictions in vectorised batches."""
+    user_ids = [user_id for (user_id,) in db.session.query(PeriodLog.user_id).distinct()] if everyone else None
+    written = refresh_predictions(user_ids, batch_size=batch_size)
+    click.echo(f'Updated {written} cycle predictions')
+
+
+@click.command('catalogs-build')
+@click.option('--language', '-l', 'languages', multiple=True,
+              type=click.Choice([code for code in LANGUAGES if code != DEFAULT_LOCALE]),
+              help='Only build these languages (repeatable). Defaults to all of them.')
+@click.option('--force', is_flag=True, help='Retranslate every message instead of only new ones.')
+@click.option('--workers', default=4, show_default=True, help='Concurrent translation requests.')
+@with_appcontext
+def catalogs_build(languages, force, workers):
+    """Translate the marked page text and canned replies into compiled catalogs."""
+    def progress(locale, translated, missing):
+        click.echo(f"{locale}: {translated} translated" + (f", {missing} left in English" if missing else ''))
+
+    build_catalogs(current_app, lambda text, locale: translator.translate(text, locale, 'en'),
+                   languages=languages or None, force=force, workers=workers, progress=progress)
+    # Running workers load each catalog once, on first use
+    click.echo('Catalogs written; restart the app to serve them.')
+
+
+@click.command('directory-rebuild')
+@click.option('--batch-size', default=500, show_default=True)
+@with_appcontext
+def directory_rebuild(batch_size):
+    """Recompute every doctor's directory summary from the doctor and appointment tables."""
+    written = directory.rebuild(batch_size=batch_size, progress=lambda done: click.echo(f'{done} doctors', err=True))
+    click.echo(f'Rebuilt {written} doctor summaries')
+
+
+def register_commands(app):
+    app.cli.add_command(sms_dispatch)
+    app.cli.add_command(reminders_run)
+    app.cli.add_command(assets_build)
+    app.cli.add_command(doctors_import)
+    app.cli.add_command(export)
+    app.cli.add_command(cycles_predict)
+    app.cli.add_command(catalogs_build)
+    app.cli.add_command(directory_rebuild)
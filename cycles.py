@@ -0,0 +1,162 @@
+import warnings
+from datetime import date, datetime
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from models import db, CyclePrediction, PeriodLog
+
+DEFAULT_CYCLE_DAYS = 28
+# Gaps outside this range are treated as a missed log or an irregular cycle and ignored
+MIN_CYCLE_DAYS = 21
+MAX_CYCLE_DAYS = 45
+HISTORY_CYCLES = 12
+LUTEAL_DAYS = 14
+# Fertile window around ovulation: the five days before it and the day after
+FERTILE_BEFORE = 5
+FERTILE_AFTER = 1
+# Extra days on each side of the fertile window when the cycle length spread is unknown
+DEFAULT_MARGIN = 2
+
+
+def predict(starts, today):
+    """Vectorised predictions for many users at once.
+
+    ``starts`` is an (users, HISTORY_CYCLES + 1) array of period start
+    dates as day ordinals, oldest to newest, right-aligned and padded with
+    NaN. Returns a dict of per-user arrays.
+    """
+    # Imported on first use so workers that never predict don't load NumPy
+    import numpy as np
+
+    lengths = np.diff(starts, axis=1)
+    plausible = (lengths >= MIN_CYCLE_DAYS) & (lengths <= MAX_CYCLE_DAYS)
+    lengths = np.where(plausible, lengths, np.nan)
+    count = plausible.sum(axis=1)
+
+    with warnings.catch_warnings():
+        # Users with no usable cycles give all-NaN rows; they fall back to the defaults below
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.where(count > 0, np.nanmean(lengths, axis=1), DEFAULT_CYCLE_DAYS)
+        std = np.where(count > 1, np.nanstd(lengths, axis=1, ddof=1), np.nan)
+
+    cycle = np.round(mean)
+    last = starts[:, -1]
+    next_start = last + cycle
+    # Roll forward whole cycles when periods have not been logged for a while
+    next_start += np.maximum(0, np.ceil((today - next_start) / cycle)) * cycle
+
+    margin = np.where(np.isnan(std), DEFAULT_MARGIN, np.ceil(np.nan_to_num(std)))
+    ovulation = next_start - LUTEAL_DAYS
+    return {
+        'cycle_count': count,
+        'mean_length': mean,
+        'std_length': std,
+        'last_start': last,
+        'next_start': next_start,
+        'fertile_start': ovulation - FERTILE_BEFORE - margin,
+        'fertile_end': ovulation + FERTILE_AFTER + margin,
+    }
+
+
+def _load_starts(user_ids):
+    """Right-aligned start-date matrix for ``user_ids``, from one indexed query."""
+    import numpy as np
+
+    history = {user_id: [] for user_id in user_ids}
+    rows = db.session.query(PeriodLog.user_id, PeriodLog.start_date).filter(
+        PeriodLog.user_id.in_(user_ids)).order_by(PeriodLog.user_id, PeriodLog.start_date)
+    for user_id, start_date in rows:
+        history[user_id].append(start_date.toordinal())
+
+    user_ids = [user_id for user_id, starts in history.items() if starts]
+    matrix = np.full((len(user_ids), HISTORY_CYCLES + 1), np.nan)
+    for row, user_id in enumerate(user_ids):
+        recent = history[user_id][-(HISTORY_CYCLES + 1):]
+        matrix[row, -len(recent):] = recent
+    return user_ids, matrix
+
+
+def users_needing_refresh(today=None):
+    """Users with logged periods whose prediction is missing, stale or already in the past."""
+    today = today or date.today()
+    query = db.session.query(PeriodLog.user_id).outerjoin(
+        CyclePrediction, CyclePrediction.user_id == PeriodLog.user_id
+    ).filter(or_(
+        CyclePrediction.user_id.is_(None), CyclePrediction.stale, CyclePrediction.next_start < today
+    )).distinct()
+    return [user_id for (user_id,) in query]
+
+
+def refresh_predictions(user_ids=None, batch_size=2000, today=None):
+    """Recompute and store predictions for ``user_ids``, or for every user that needs it.
+
+    Returns the number of predictions written.
+    """
+    import numpy as np
+
+    today = today or date.today()
+    if user_ids is None:
+        user_ids = users_needing_refresh(today)
+    written = 0
+    for offset in range(0, len(user_ids), batch_size):
+        batch, starts = _load_starts(user_ids[offset:offset + batch_size])
+        if not batch:
+            continue
+        result = predict(starts, today.toordinal())
+        now = datetime.utcnow()
+        rows = []
+        for i, user_id in enumerate(batch):
+            std = result['std_length'][i]
+            rows.append({
+                'user_id': user_id,
+                'cycle_count': int(result['cycle_count'][i]),
+                'mean_length': round(float(result['mean_length'][i]), 1),
+                'std_length': None if np.isnan(std) else round(float(std), 1),
+                'last_start': date.fromordinal(int(result['last_start'][i])),
+                'next_start': date.fromordinal(int(result['next_start'][i])),
+                'fertile_start': date.fromordinal(int(result['fertile_start'][i])),
+                'fertile_end': date.fromordinal(int(result['fertile_end'][i])),
+                'stale': False,
+                'computed_at': now,
+            })
+        # Replace rather than upsert so this works the same on SQLite and PostgreSQL
+        try:
+            db.session.query(CyclePrediction).filter(CyclePrediction.user_id.in_(batch)).delete(
+                synchronize_session=False)
+            db.session.execute(db.insert(CyclePrediction), rows)
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request stored predictions for some of these users first, from the same logs;
+            # anyone it missed is still stale and is picked up by the next refresh
+            db.session.rollback()
+            continue
+        written += len(rows)
+    return written
+
+
+def record_period(user_id, start_date):
+    """Log a period start and mark the user's prediction stale. Returns False if it was already logged."""
+    try:
+        db.session.add(PeriodLog(user_id=user_id, start_date=start_date))
+        db.session.query(CyclePrediction).filter_by(user_id=user_id).update({'stale': True}, synchronize_session=False)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def prediction_for(user_id, today=None):
+    """The stored prediction for one user, recomputed first if it is missing or out of date."""
+    today = today or date.today()
+    prediction = db.session.get(CyclePrediction, user_id)
+    if prediction is None or prediction.stale or prediction.next_start < today:
+        refresh_predictions([user_id], today=today)
+        # Re-read either way: the row may have been written by a concurrent request instead
+        prediction = db.session.get(CyclePrediction, user_id, populate_existing=True)
+    return prediction
+
+
+def recent_periods(user_id, limit=HISTORY_CYCLES):
+    return PeriodLog.query.filter_by(user_id=user_id).order_by(PeriodLog.start_date.desc()).limit(limit).all()
@@ -0,0 +1,48 @@
+from datetime import date
+
+from sqlalchemy.orm import joinedload
+
+from database import read_session
+from models import Appointment
+
+PAGE_SIZE = 20
+
+
+class AppointmentPage:
+    def __init__(self, items, when, page, has_next):
+        self.items = items
+        self.when = when
+        self.page = page
+        self.has_prev = page > 1
+        self.has_next = has_next
+
+
+def appointment_page(owner_column, owner_id, related, when='upcoming', page=1, per_page=PAGE_SIZE):
+    """Load one page of upcoming or past appointments with ``related`` joined in the same query.
+
+    Filtering, ordering and paging all happen in SQL against the
+    (owner, date) indexes, and one extra row is fetched to know whether a
+    next page exists without a COUNT.
+    """
+    when = 'past' if when == 'past' else 'upcoming'
+    page = max(page or 1, 1)
+    today = date.today()
+
+    query = read_session().query(Appointment).options(joinedload(related)).filter(owner_column == owner_id)
+    if when == 'upcoming':
+        query = query.filter(Appointment.date >= today).order_by(
+            Appointment.date.asc(), Appointment.slot.asc(), Appointment.id.asc())
+    else:
+        query = query.filter(Appointment.date < today).order_by(
+            Appointment.date.desc(), Appointment.slot.desc(), Appointment.id.desc())
+
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return AppointmentPage(rows[:per_page], when, page, len(rows) > per_page)
+
+
+def patient_appointments(user_id, when='upcoming', page=1):
+    return appointment_page(Appointment.user_id, user_id, Appointment.doctor, when, page)
+
+
+def doctor_appointments(doctor_id, when='upcoming', page=1):
+    return appointment_page(Appointment.doctor_id, doctor_id, Appointment.patient, when, page)
@@ -0,0 +1,76 @@
+import os
+
+from flask import current_app
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from models import db
+
+DEFAULT_DATABASE_URL = 'sqlite:///shewell.db'
+
+
+def engine_options(url, environ=os.environ):
+    """Engine keyword arguments for ``url``, tuned from DB_* environment variables."""
+    if make_url(url).get_backend_name() == 'sqlite':
+        # Busy waiting is handled by the busy_timeout pragma set on connect
+        return {}
+    return {
+        'pool_size': int(environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+def database_config(environ=os.environ):
+    url = environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    # Some providers still hand out the deprecated postgres:// scheme
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    read_url = environ.get('DATABASE_READ_URL') or None
+    return {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(url, environ),
+        'DATABASE_READ_URI': read_url,
+        'SQLITE_BUSY_TIMEOUT_MS': int(environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    }
+
+
+def _install_sqlite_pragmas(engine, busy_timeout_ms):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed during a write; NORMAL sync is safe with WAL and avoids an fsync per commit
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+
+def init_database(app):
+    """Apply connection tuning to the primary engine and set up the optional read engine."""
+    busy_timeout_ms = app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    with app.app_context():
+        _install_sqlite_pragmas(db.engine, busy_timeout_ms)
+
+    read_url = app.config.get('DATABASE_READ_URI')
+    if not read_url:
+        return
+    read_engine = create_engine(read_url, **engine_options(read_url))
+    _install_sqlite_pragmas(read_engine, busy_timeout_ms)
+    session = scoped_session(sessionmaker(bind=read_engine), scopefunc=db.session.registry.scopefunc)
+    app.extensions['read_session'] = session
+
+    @app.teardown_appcontext
+    def remove_read_session(exception=None):
+        session.remove()
+
+
+def read_session():
+    """Session for read-only listing and dashboard queries; the primary session when no replica is set."""
+    return current_app.extensions.get('read_session') or db.session
@@ -0,0 +1,266 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import and_, case, event, func, inspect, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, Appointment, Doctor, DoctorAvailability, DoctorSummary
+from slots import day_slots
+
+DOCTOR_FIELDS = ('name', 'specialization', 'experience', 'available_days', 'per_minute_price')
+
+
+def _counts(connection, doctor_ids):
+    """{doctor_id: (total_bookings, upcoming_count)} from one grouped query."""
+    booked = or_(Appointment.status.is_(None), Appointment.status != 'cancelled')
+    rows = connection.execute(
+        select(Appointment.doctor_id,
+               func.sum(case((booked, 1), else_=0)),
+               func.sum(case((Appointment.status == 'scheduled', 1), else_=0)))
+        .where(Appointment.doctor_id.in_(doctor_ids)).group_by(Appointment.doctor_id))
+    return {doctor_id: (total or 0, upcoming or 0) for doctor_id, total, upcoming in rows}
+
+
+def _free_dates(connection, doctor_ids, start, end):
+    """{doctor_id: first working day from ``start`` to ``end`` with a free slot, or None}.
+
+    Only fully booked days are read, from the (doctor_id, date, slot) index.
+    """
+    weekdays = defaultdict(set)
+    for doctor_id, weekday in connection.execute(
+            select(DoctorAvailability.doctor_id, DoctorAvailability.weekday)
+            .where(DoctorAvailability.doctor_id.in_(doctor_ids))):
+        weekdays[doctor_id].add(weekday)
+    full = set(connection.execute(
+        select(Appointment.doctor_id, Appointment.date)
+        .where(Appointment.doctor_id.in_(doctor_ids), Appointment.date >= start, Appointment.date <= end,
+               Appointment.slot.isnot(None))
+        .group_by(Appointment.doctor_id, Appointment.date)
+        .having(func.count(Appointment.slot) >= len(day_slots()))))
+
+    free = {}
+    for doctor_id in doctor_ids:
+        free[doctor_id] = None
+        day = start
+        while day <= end:
+            if day.weekday() in weekdays[doctor_id] and (doctor_id, day) not in full:
+                free[doctor_id] = day
+                break
+            day += timedelta(days=1)
+    return free
+
+
+class DoctorDirectory:
+    """Maintains the doctor_summary read model the doctor directory lists from.
+
+    Once watch() is called, every flush that creates an appointment, changes
+    its status or slot, or edits a doctor adjusts the affected summary rows
+    in the same transaction: counters by delta, and next_free_date only when
+    the change can move it. refresh() recomputes rows from the source tables
+    and rebuild() recomputes all of them.
+
+    next_free_date goes out of date as days pass. refresh_stale() fixes the
+    rows where that matters and is cheap enough to call before listings.
+    """
+
+    def __init__(self, horizon_days=60, check_interval=60):
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.configure(horizon_days, check_interval)
+
+    def configure(self, horizon_days=60, check_interval=60):
+        self.horizon_days = horizon_days
+        self.check_interval = check_interval
+
+    def summarise(self, connection, doctor_ids, today=None):
+        """Freshly computed summary rows for ``doctor_ids``."""
+        today = today or date.today()
+        if not doctor_ids:
+            return []
+        doctors = connection.execute(
+            select(Doctor.id, *(getattr(Doctor, field) for field in DOCTOR_FIELDS)).where(Doctor.id.in_(doctor_ids))
+        ).all()
+        doctor_ids = [doctor.id for doctor in doctors]
+        counts = _counts(connection, doctor_ids)
+        free = _free_dates(connection, doctor_ids, today, today + timedelta(days=self.horizon_days))
+        rows = []
+        for doctor in doctors:
+            total, upcoming = counts.get(doctor.id, (0, 0))
+            row = {field: getattr(doctor, field) for field in DOCTOR_FIELDS}
+            row.update(doctor_id=doctor.id, total_bookings=total, upcoming_count=upcoming,
+                       next_free_date=free[doctor.id], refreshed_on=today)
+            rows.append(row)
+        return rows
+
+    def refresh(self, doctor_ids, today=None, commit=True, batch_size=500):
+        """Recompute the summaries of ``doctor_ids``, creating any that are missing."""
+        doctor_ids = list(doctor_ids)
+        written = 0
+        for offset in range(0, len(doctor_ids), batch_size):
+            rows = self.summarise(db.session, doctor_ids[offset:offset + batch_size], today)
+            existing = {doctor_id for (doctor_id,) in db.session.query(DoctorSummary.doctor_id).filter(
+                DoctorSummary.doctor_id.in_([row['doctor_id'] for row in rows]))}
+            updates = [row for row in rows if row['doctor_id'] in existing]
+            inserts = [row for row in rows if row['doctor_id'] not in existing]
+            if updates:
+                db.session.execute(update(DoctorSummary), updates)
+            if inserts:
+                db.session.execute(db.insert(DoctorSummary), inserts)
+            written += len(rows)
+        if commit and written:
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Another worker created the same rows first; theirs are just as fresh
+                db.session.rollback()
+        return written
+
+    def rebuild(self, batch_size=500, today=None, progress=None):
+        """Recompute every summary in batches of doctors and drop rows for doctors that no longer exist."""
+        written = 0
+        last_id = 0
+        while True:
+            doctor_ids = [doctor_id for (doctor_id,) in db.session.query(Doctor.id).filter(
+                Doctor.id > last_id).order_by(Doctor.id).limit(batch_size)]
+            if not doctor_ids:
+                break
+            rows = self.summarise(db.session, doctor_ids, today)
+            db.session.query(DoctorSummary).filter(DoctorSummary.doctor_id.in_(doctor_ids)).delete(
+                synchronize_session=False)
+            db.session.execute(db.insert(DoctorSummary), rows)
+            db.session.commit()
+            written += len(rows)
+            last_id = doctor_ids[-1]
+            if progress:
+                progress(written)
+        db.session.query(DoctorSummary).filter(~DoctorSummary.doctor_id.in_(select(Doctor.id))).delete(
+            synchronize_session=False)
+        db.session.commit()
+        return written
+
+    def stale_ids(self, today=None):
+        """Doctors whose next_free_date has passed, or was worked out before today and found nothing free."""
+        today = today or date.today()
+        return [doctor_id for (doctor_id,) in db.session.query(DoctorSummary.doctor_id).filter(or_(
+            DoctorSummary.refreshed_on.is_(None),
+            and_(DoctorSummary.refreshed_on < today,
+                 or_(DoctorSummary.next_free_date.is_(None), DoctorSummary.next_free_date < today)),
+        ))]
+
+    def refresh_stale(self, today=None):
+        """Refresh stale rows, checking at most once per ``check_interval`` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return 0
+            self._checked_at = now
+        return self.refresh(self.stale_ids(today), today)
+
+    def watch(self):
+        event.listen(Session, 'after_flush', self._after_flush)
+
+    def _after_flush(self, session, flush_context):
+        recompute = set()
+        field_changes = {}
+        deltas = defaultdict(lambda: [0, 0])
+        busier = set()
+        freed = set()
+
+        for instance in session.new:
+            if isinstance(instance, Doctor):
+                recompute.add(instance.id)
+            elif isinstance(instance, Appointment):
+                self._count(deltas[instance.doctor_id], instance.status or 'scheduled', 1)
+                if instance.slot is not None:
+                    busier.add((instance.doctor_id, instance.date))
+
+        for instance in session.dirty:
+            state = inspect(instance)
+            if isinstance(instance, Doctor):
+                changed = {field: getattr(instance, field) for field in DOCTOR_FIELDS
+                           if state.attrs[field].history.has_changes()}
+                if 'available_days' in changed:
+                    recompute.add(instance.id)
+                elif changed:
+                    field_changes[instance.id] = changed
+            elif isinstance(instance, Appointment):
+                status = state.attrs.status.history
+                if status.has_changes() and status.deleted:
+                    self._count(deltas[instance.doctor_id], status.deleted[0], -1)
+                    self._count(deltas[instance.doctor_id], instance.status, 1)
+                old_date = state.attrs.date.history.deleted
+                old_slot = state.attrs.slot.history.deleted
+                if old_date or old_slot:
+                    previous = (old_date[0] if old_date else instance.date, old_slot[0] if old_slot else instance.slot)
+                    if previous[1] is not None:
+                        freed.add((instance.doctor_id, previous[0]))
+                    if instance.slot is not None:
+                        busier.add((instance.doctor_id, instance.date))
+
+        for instance in session.deleted:
+            if isinstance(instance, Appointment):
+                self._count(deltas[instance.doctor_id], instance.status, -1)
+                if instance.slot is not None:
+                    freed.add((instance.doctor_id, instance.date))
+
+        if not (recompute or field_changes or deltas or busier or freed):
+            return
+        self._apply(session.connection(), recompute, field_changes, deltas, busier, freed)
+
+    @staticmethod
+    def _count(delta, status, sign):
+        if status != 'cancelled':
+            delta[0] += sign
+        if status == 'scheduled':
+            delta[1] += sign
+
+    def _apply(self, connection, recompute, field_changes, deltas, busier, freed):
+        table = DoctorSummary.__table__
+        today = date.today()
+
+        for doctor_id, values in field_changes.items():
+            if not connection.execute(table.update().where(table.c.doctor_id == doctor_id).values(**values)).rowcount:
+                recompute.add(doctor_id)
+        for doctor_id, (total, upcoming) in deltas.items():
+            if doctor_id in recompute or not (total or upcoming):
+                continue
+            result = connection.execute(table.update().where(table.c.doctor_id == doctor_id).values(
+                total_bookings=table.c.total_bookings + total, upcoming_count=table.c.upcoming_count + upcoming))
+            if not result.rowcount:
+                # No summary yet (a doctor created outside the ORM); build it from scratch instead
+                recompute.add(doctor_id)
+
+        touched = {doctor_id for doctor_id, _ in busier | freed} - recompute
+        if touched:
+            current = dict(connection.execute(
+                select(table.c.doctor_id, table.c.next_free_date).where(table.c.doctor_id.in_(touched))).all())
+            horizon = today + timedelta(days=self.horizon_days)
+            for doctor_id, day in freed:
+                # A released slot can only bring the next free day forward
+                if doctor_id in current and today <= day <= horizon and (current[doctor_id] is None or day < current[doctor_id]):
+                    current[doctor_id] = day
+                    connection.execute(table.update().where(table.c.doctor_id == doctor_id).values(next_free_date=day))
+            for doctor_id, day in busier:
+                # A new booking only matters if it may have filled the next free day
+                if doctor_id in current and day == current[doctor_id]:
+                    free = _free_dates(connection, [doctor_id], day, horizon)[doctor_id]
+                    current[doctor_id] = free
+                    connection.execute(table.update().where(table.c.doctor_id == doctor_id).values(
+                        next_free_date=free, refreshed_on=today))
+
+        if recompute:
+            rows = self.summarise(connection, list(recompute), today)
+            existing = {doctor_id for (doctor_id,) in connection.execute(
+                select(table.c.doctor_id).where(table.c.doctor_id.in_(recompute)))}
+            for row in rows:
+                if row['doctor_id'] in existing:
+                    connection.execute(table.update().where(table.c.doctor_id == row['doctor_id']).values(**row))
+                else:
+                    connection.execute(table.insert().values(**row))
+
+
+# Sized from the app config by services.init_services
+directory = DoctorDirectory()
@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+
+from sqlalchemy.exc import IntegrityError
+
+from availability import parse_available_days
+from doctor_directory import directory
+from models import db, Doctor, DoctorAvailability
+from passwords import hasher
+
+REQUIRED_FIELDS = ('name', 'email', 'password', 'specialization', 'phone')
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename, default='csv'):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def iter_records(stream, fmt):
+    """Yield ``(line_number, record_or_error)`` from a binary CSV or JSONL stream without reading it all."""
+    if fmt not in FORMATS:
+        raise ImportFormatError(f'Unsupported format "{fmt}"; expected one of {", ".join(FORMATS)}')
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or [])]
+            if missing:
+                raise ImportFormatError(f'CSV header is missing {", ".join(missing)}')
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f'Invalid JSON: {e}')
+                continue
+            yield line_number, record if isinstance(record, dict) else ValueError('Each line must be a JSON object')
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def validate(record):
+    """Return the Doctor column values and working weekdays for one import row, or raise ValueError."""
+    values = {field: str(record.get(field) or '').strip() for field in REQUIRED_FIELDS}
+    missing = [field for field, value in values.items() if not value]
+    if missing:
+        raise ValueError(f'Missing {", ".join(missing)}')
+    if '@' not in values['email']:
+        raise ValueError('Invalid email')
+    try:
+        experience = int(record.get('experience') or 0)
+        price = float(record.get('per_minute_price') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('experience and per_minute_price must be numbers') from None
+    if experience < 0 or price < 0:
+        raise ValueError('experience and per_minute_price cannot be negative')
+    available_days = str(record.get('available_days') or 'Mon-Fri').strip()
+    weekdays = parse_available_days(available_days)
+    if not weekdays:
+        raise ValueError(f'Could not understand available days "{available_days}"')
+    values.update(experience=experience, per_minute_price=price, available_days=available_days)
+    return values, weekdays
+
+
+class ImportReport:
+    def __init__(self, max_errors=1000):
+        self.max_errors = max_errors
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line_number, email, message, duplicate=False):
+        if duplicate:
+            self.duplicates += 1
+        else:
+            self.failed += 1
+        # Counts stay exact; only the detailed list is capped
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'email': email, 'error': message})
+
+    def summary(self):
+        return {'processed': self.processed, 'created': self.created, 'duplicates': self.duplicates,
+                'failed': self.failed}
+
+    def to_dict(self):
+        return dict(self.summary(), errors=self.errors, errors_truncated=len(self.errors) < self.duplicates + self.failed)
+
+
+class DoctorImporter:
+    """Creates doctors from a stream of records in batches.
+
+    Each batch costs one query to find already-registered emails, one
+    parallel hashing pass, two bulk INSERTs (doctors, then their
+    availability) and the batch's directory summaries, committed together.
+    Emails repeated within the file are reported as duplicates of their
+    first occurrence.
+    """
+
+    def __init__(self, batch_size=500, max_errors=1000):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def iter_batches(self, records):
+        """Import ``records``, yielding the running ImportReport after each committed batch."""
+        report = ImportReport(self.max_errors)
+        seen = set()
+        batch = []
+        for line_number, record in records:
+            report.processed += 1
+            if isinstance(record, Exception):
+                report.error(line_number, None, str(record))
+                continue
+            email = str(record.get('email') or '').strip() or None
+            try:
+                values, weekdays = validate(record)
+            except ValueError as e:
+                report.error(line_number, email, str(e))
+                continue
+            if email in seen:
+                report.error(line_number, email, 'Duplicate email in file', duplicate=True)
+                continue
+            seen.add(email)
+            batch.append((line_number, values, weekdays))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, report)
+                batch = []
+                yield report
+        if batch:
+            self._import_batch(batch, report)
+        yield report
+
+    def run(self, records, progress=None):
+        for report in self.iter_batches(records):
+            if progress:
+                progress(report)
+        return report
+
+    def _existing_emails(self, emails):
+        return {email for (email,) in db.session.query(Doctor.email).filter(Doctor.email.in_(emails))}
+
+    def _import_batch(self, batch, report):
+        existing = self._existing_emails([values['email'] for _, values, _ in batch])
+        fresh = []
+        for line_number, values, weekdays in batch:
+            if values['email'] in existing:
+                report.error(line_number, values['email'], 'Email is already registered', duplicate=True)
+            else:
+                fresh.append((line_number, values, weekdays))
+        if not fresh:
+            return
+
+        hashes = hasher.hash_many(values['password'] for _, values, _ in fresh)
+        rows = []
+        for (_, values, _), password_hash in zip(fresh, hashes):
+            row = {key: value for key, value in values.items() if key != 'password'}
+            row['password_hash'] = password_hash
+            rows.append(row)
+
+        try:
+            ids = db.session.scalars(
+                db.insert(Doctor).returning(Doctor.id, sort_by_parameter_order=True), rows).all()
+            db.session.execute(db.insert(DoctorAvailability), [
+                {'weekday': weekday, 'doctor_id': doctor_id}
+                for doctor_id, (_, _, weekdays) in zip(ids, fresh) for weekday in weekdays
+            ])
+            # Bulk inserts skip the session events, so directory rows are added here in the same transaction
+            directory.refresh(ids, commit=False)
+            db.session.commit()
+        except IntegrityError:
+            # Someone registered one of these emails since the check; retry in halves to isolate it
+            db.session.rollback()
+            if len(fresh) == 1:
+                report.error(fresh[0][0], fresh[0][1]['email'], 'Email is already registered', duplicate=True)
+                return
+            middle = len(fresh) // 2
+            self._import_batch(fresh[:middle], report)
+            self._import_batch(fresh[middle:], report)
+            return
+        report.created += len(ids)
@@ -0,0 +1,140 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+from sqlalchemy import and_, or_
+
+from availability import parse_available_days
+from database import read_session
+from models import DoctorAvailability, DoctorSummary
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# sort name -> (column, descending); the doctor id is always the ascending tie-breaker.
+# Everything is read from the doctor_summary read model, so each sort is one index scan.
+SORTS = {
+    'name': (DoctorSummary.name, False),
+    'experience': (DoctorSummary.experience, True),
+    'price': (DoctorSummary.per_minute_price, False),
+    'soonest': (DoctorSummary.next_free_date, False),
+    'popular': (DoctorSummary.total_bookings, True),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort, doctor):
+    column, _ = SORTS[sort]
+    value = getattr(doctor, column.key)
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, doctor.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor, sort):
+    """Return the sort value and id stored in ``cursor``, checked against the ``sort`` being paged."""
+    try:
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor('Malformed cursor')
+    if cursor_sort != sort:
+        raise InvalidCursor('Cursor belongs to a different sort')
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise InvalidCursor('Malformed cursor')
+    return cursor_value(SORTS[sort][0], value), last_id
+
+
+def cursor_value(column, value):
+    """Turn a decoded cursor value back into something comparable with ``column``, or raise InvalidCursor."""
+    if value is None and column.nullable:
+        return None
+    if column is DoctorSummary.next_free_date:
+        try:
+            return date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Malformed cursor')
+    expected = column.type.python_type
+    if expected is float:
+        expected = (int, float)
+    if not isinstance(value, expected) or isinstance(value, bool):
+        raise InvalidCursor('Malformed cursor')
+    return value
+
+
+def doctors_on_weekday(weekday, query=None):
+    """Restrict ``query`` (all doctors by default) to those who work on ``weekday`` (Mon=0)."""
+    query = query if query is not None else read_session().query(DoctorSummary)
+    return query.join(DoctorAvailability, DoctorAvailability.doctor_id == DoctorSummary.doctor_id).filter(
+        DoctorAvailability.weekday == weekday)
+
+
+def doctors_available_on(date, query=None):
+    return doctors_on_weekday(date.weekday(), query)
+
+
+def search_doctors(specialization=None, day=None, date=None, min_experience=None, min_price=None, max_price=None,
+                   sort='name', cursor=None, limit=PAGE_SIZE):
+    """Return one page of doctors matching the filters and the cursor for the next page.
+
+    Pagination is keyset based: the cursor carries the sort, sort value and
+    id of the last row served, so deep pages cost the same as the first one.
+    A cursor from another sort or with the wrong value type raises
+    InvalidCursor.
+    Doctors with no free day in the booking horizon come last when sorting
+    by soonest availability.
+    """
+    if sort not in SORTS:
+        sort = 'name'
+    column, descending = SORTS[sort]
+    limit = max(1, min(limit or PAGE_SIZE, MAX_PAGE_SIZE))
+
+    query = read_session().query(DoctorSummary)
+    if specialization:
+        query = query.filter(DoctorSummary.specialization == specialization)
+    if date:
+        query = doctors_available_on(date, query)
+    elif day:
+        weekdays = parse_available_days(day)
+        if len(weekdays) == 1:
+            query = doctors_on_weekday(weekdays[0], query)
+    if min_experience:
+        query = query.filter(DoctorSummary.experience >= min_experience)
+    if min_price is not None:
+        query = query.filter(DoctorSummary.per_minute_price >= min_price)
+    if max_price is not None:
+        query = query.filter(DoctorSummary.per_minute_price <= max_price)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if value is None:
+            # Already into the trailing rows with no free day
+            query = query.filter(column.is_(None), DoctorSummary.doctor_id > last_id)
+        else:
+            past_value = column < value if descending else column > value
+            query = query.filter(or_(past_value, and_(column == value, DoctorSummary.doctor_id > last_id),
+                                     column.is_(None)))
+
+    order = column.desc() if descending else column.asc()
+    rows = query.order_by(order.nulls_last(), DoctorSummary.doctor_id.asc()).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def doctor_to_dict(doctor):
+    return {
+        'id': doctor.id,
+        'name': doctor.name,
+        'specialization': doctor.specialization,
+        'experience': doctor.experience,
+        'available_days': doctor.available_days,
+        'per_minute_price': doctor.per_minute_price,
+        'next_free_date': doctor.next_free_date.isoformat() if doctor.next_free_date else None,
+        'total_bookings': doctor.total_bookings,
+        'upcoming_count': doctor.upcoming_count,
+    }
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from database import read_session
+from models import Appointment, ChatHistory, Doctor, User
+
+BATCH_SIZE = 1000
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+APPOINTMENT_COLUMNS = [
+    Appointment.id, Appointment.date, Appointment.time, Appointment.status,
+    Appointment.doctor_id, Doctor.name.label('doctor_name'),
+    Appointment.user_id, User.name.label('patient_name'), Appointment.created_at,
+]
+CHAT_HISTORY_COLUMNS = [ChatHistory.id, ChatHistory.user_id, ChatHistory.timestamp, ChatHistory.message,
+                        ChatHistory.response]
+
+
+def _stream(statement, batch_size):
+    # yield_per fetches in batches (a server-side cursor where the driver has one), so only
+    # one batch of rows is ever held in memory
+    return read_session().execute(statement.execution_options(yield_per=batch_size))
+
+
+def appointment_rows(doctor_id=None, start=None, end=None, batch_size=BATCH_SIZE):
+    """Appointments between ``start`` and ``end`` (inclusive dates), optionally for one doctor.
+
+    With a doctor the scan follows the (doctor_id, date, slot) unique index,
+    otherwise ix_appointment_date.
+    """
+    statement = select(*APPOINTMENT_COLUMNS).join(Doctor, Appointment.doctor_id == Doctor.id).join(
+        User, Appointment.user_id == User.id)
+    if doctor_id is not None:
+        statement = statement.where(Appointment.doctor_id == doctor_id)
+    if start:
+        statement = statement.where(Appointment.date >= start)
+    if end:
+        statement = statement.where(Appointment.date <= end)
+    if doctor_id is not None:
+        statement = statement.order_by(Appointment.date, Appointment.slot, Appointment.id)
+    else:
+        statement = statement.order_by(Appointment.date, Appointment.id)
+    return _stream(statement, batch_size)
+
+
+def chat_history_rows(user_id=None, start=None, end=None, batch_size=BATCH_SIZE):
+    """Chat turns from ``start`` to the end of ``end`` (dates), optionally for one patient.
+
+    Uses ix_chat_history_user_id_timestamp with a patient and
+    ix_chat_history_timestamp without.
+    """
+    statement = select(*CHAT_HISTORY_COLUMNS)
+    if user_id is not None:
+        statement = statement.where(ChatHistory.user_id == user_id)
+    if start:
+        statement = statement.where(ChatHistory.timestamp >= datetime.combine(start, time.min))
+    if end:
+        statement = statement.where(ChatHistory.timestamp < datetime.combine(end + timedelta(days=1), time.min))
+    return _stream(statement.order_by(ChatHistory.timestamp, ChatHistory.id), batch_size)
+
+
+def _value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(result, batch_size=BATCH_SIZE):
+    """Encode a result as CSV text chunks of up to ``batch_size`` rows each."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    for partition in result.partitions(batch_size):
+        writer.writerows([_value(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_jsonl(result, batch_size=BATCH_SIZE):
+    """Encode a result as JSON Lines text chunks of up to ``batch_size`` rows each."""
+    keys = list(result.keys())
+    for partition in result.partitions(batch_size):
+        yield ''.join(json.dumps({key: _value(value) for key, value in zip(keys, row)}) + '\n' for row in partition)
+
+
+def encode(result, fmt):
+    return iter_csv(result) if fmt == 'csv' else iter_jsonl(result)
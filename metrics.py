@@ -0,0 +1,300 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter
+
+from flask import Blueprint, Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+bp = Blueprint('metrics', __name__)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts, then the running sum and count
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", bound)])} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", "+Inf")])} {series[-1]}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}')
+        return lines
+
+
+class CacheLookups:
+    """Hit and miss totals that caches keep themselves, read from their stats() when /metrics is scraped."""
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._sources = []
+
+    def track(self, cache, stats, results):
+        """Export ``stats()[field]`` as the ``result`` series of ``cache`` for each result -> field in ``results``."""
+        self._sources.append((cache, stats, results))
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for cache, stats, results in self._sources:
+            values = stats()
+            for result, field in results.items():
+                lines.append(f'{self.name}{_format_labels(("cache", "result"), (cache, result))} {values[field]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent handling a request.', ['method', 'route', 'status']))
+request_queries = registry.register(Histogram(
+    'http_request_db_queries', 'SQL statements executed per request.', ['route'], buckets=COUNT_BUCKETS))
+request_query_time = registry.register(Histogram(
+    'http_request_db_seconds', 'Time spent in SQL per request.', ['route']))
+query_duration = registry.register(Histogram(
+    'db_query_duration_seconds', 'Duration of individual SQL statements.', ['outcome']))
+outbound_duration = registry.register(Histogram(
+    'outbound_call_duration_seconds', 'Duration of calls to upstream services.', ['dependency', 'outcome']))
+outbound_rejections = registry.register(Counter(
+    'outbound_rejections_total', 'Upstream calls refused by a bulkhead or circuit breaker, or abandoned on timeout.',
+    ['dependency', 'reason']))
+cache_lookups = registry.register(CacheLookups(
+    'cache_lookups_total', 'Lookups in the in-process response and translation caches, by result.'))
+
+
+def observe_outbound(dependency, seconds, outcome):
+    outbound_duration.observe(seconds, dependency=dependency, outcome=outcome)
+
+
+def count_rejection(dependency, reason):
+    outbound_rejections.inc(dependency=dependency, reason=reason)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _finish_query(conn, outcome):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    query_duration.observe(elapsed, outcome=outcome)
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_seconds += elapsed
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish_query(conn, 'ok')
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # after_cursor_execute never fires for a failed statement, e.g. the IntegrityErrors callers catch
+    if exception_context.connection is not None and exception_context.execution_context is not None:
+        _finish_query(exception_context.connection, 'error')
+
+
+class SamplingProfiler:
+    """Samples the stacks of threads serving requests and dumps them for slow requests.
+
+    Every ``interval`` seconds a background thread records the current stack
+    of each in-flight request. Requests that take longer than ``threshold``
+    seconds have their samples written to ``output_dir`` in folded-stack
+    format, ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, output_dir, threshold=1.0, interval=0.005):
+        self.output_dir = output_dir
+        self.threshold = threshold
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = StackCounter()
+
+    def end(self, label, seconds):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or seconds < self.threshold:
+            return None
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'root'
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(seconds * 1000)}ms-{name}.folded")
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        logger.warning(f"Slow request {label} took {seconds:.2f}s; stacks written to {path}")
+        return path
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _begin_request():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+    profiler = current_app.extensions.get('profiler')
+    if profiler:
+        profiler.begin()
+
+
+def _finish_request(status):
+    if 'request_started' not in g or g.get('request_recorded'):
+        return
+    g.request_recorded = True
+    elapsed = time.perf_counter() - g.request_started
+    route = _route()
+    request_duration.observe(elapsed, method=request.method, route=route, status=status)
+    request_queries.observe(g.sql_queries, route=route)
+    request_query_time.observe(g.sql_seconds, route=route)
+    profiler = current_app.extensions.get('profiler')
+    if profiler:
+        profiler.end(f'{request.method} {route}', elapsed)
+
+
+@bp.route('/metrics')
+def metrics():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Record per-route latency and SQL usage for every request and serve them on /metrics.
+
+    Streamed responses are timed until the view returns, i.e. to the first byte.
+    """
+    app.config.setdefault('METRICS_TOKEN', os.getenv('METRICS_TOKEN'))
+    app.register_blueprint(bp)
+
+    threshold_ms = os.getenv('PROFILE_SLOW_REQUESTS_MS')
+    if threshold_ms:
+        profiler = SamplingProfiler(
+            os.getenv('PROFILE_DIR', os.path.join(app.instance_path, 'profiles')),
+            threshold=float(threshold_ms) / 1000,
+            interval=float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000
+        )
+        profiler.start()
+        app.extensions['profiler'] = profiler
+
+    app.before_request(_begin_request)
+
+    @app.after_request
+    def record_request(response):
+        _finish_request(response.status_code)
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exception=None):
+        # after_request is skipped when a view raises, so count those here
+        _finish_request(500)
@@ -0,0 +1,32 @@
+"""Add doctor search indexes
+
+Revision ID: 2b8f4d6a0c13
+Revises: 9c1e7b2d4a61
+Create Date: 2026-10-18 10:04:18.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8f4d6a0c13'
+down_revision = '9c1e7b2d4a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_name', ['name'], unique=False)
+        batch_op.create_index('ix_doctor_specialization_name', ['specialization', 'name'], unique=False)
+        batch_op.create_index('ix_doctor_experience', ['experience'], unique=False)
+        batch_op.create_index('ix_doctor_per_minute_price', ['per_minute_price'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_per_minute_price')
+        batch_op.drop_index('ix_doctor_experience')
+        batch_op.drop_index('ix_doctor_specialization_name')
+        batch_op.drop_index('ix_doctor_name')
@@ -0,0 +1,32 @@
+"""Drop the doctor search indexes now served by doctor_summary
+
+Revision ID: 2e4a6c8b0d57
+Revises: 9d2f4b6e8a13
+Create Date: 2026-10-19 10:02:18.550947
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e4a6c8b0d57'
+down_revision = '9d2f4b6e8a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_per_minute_price')
+        batch_op.drop_index('ix_doctor_experience')
+        batch_op.drop_index('ix_doctor_specialization_name')
+        batch_op.drop_index('ix_doctor_name')
+
+
+def downgrade():
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_name', ['name'], unique=False)
+        batch_op.create_index('ix_doctor_specialization_name', ['specialization', 'name'], unique=False)
+        batch_op.create_index('ix_doctor_experience', ['experience'], unique=False)
+        batch_op.create_index('ix_doctor_per_minute_price', ['per_minute_price'], unique=False)
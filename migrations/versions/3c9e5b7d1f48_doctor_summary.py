@@ -0,0 +1,67 @@
+"""Add the doctor_summary directory read model
+
+Revision ID: 3c9e5b7d1f48
+Revises: 8f1c3e5a7d29
+Create Date: 2026-10-18 22:41:09.317254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e5b7d1f48'
+down_revision = '8f1c3e5a7d29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('doctor_summary',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('specialization', sa.String(length=100), nullable=False),
+    sa.Column('experience', sa.Integer(), nullable=False),
+    sa.Column('available_days', sa.String(length=100), nullable=False),
+    sa.Column('per_minute_price', sa.Float(), nullable=False),
+    sa.Column('total_bookings', sa.Integer(), nullable=False),
+    sa.Column('upcoming_count', sa.Integer(), nullable=False),
+    sa.Column('next_free_date', sa.Date(), nullable=True),
+    sa.Column('refreshed_on', sa.Date(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('doctor_id')
+    )
+    with op.batch_alter_table('doctor_summary', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_summary_experience', ['experience'], unique=False)
+        batch_op.create_index('ix_doctor_summary_name', ['name'], unique=False)
+        batch_op.create_index('ix_doctor_summary_next_free_date', ['next_free_date'], unique=False)
+        batch_op.create_index('ix_doctor_summary_per_minute_price', ['per_minute_price'], unique=False)
+        batch_op.create_index('ix_doctor_summary_specialization_name', ['specialization', 'name'], unique=False)
+        batch_op.create_index('ix_doctor_summary_total_bookings', ['total_bookings'], unique=False)
+
+    # Counts are filled in here; next_free_date is left NULL with refreshed_on NULL, which marks
+    # every row stale so the first directory listing (or `flask directory-rebuild`) fills it in
+    op.execute(
+        "INSERT INTO doctor_summary (doctor_id, name, specialization, experience, available_days, per_minute_price, "
+        "total_bookings, upcoming_count) "
+        "SELECT doctor.id, doctor.name, doctor.specialization, doctor.experience, doctor.available_days, "
+        "doctor.per_minute_price, "
+        "COALESCE(SUM(CASE WHEN appointment.id IS NOT NULL AND (appointment.status IS NULL "
+        "OR appointment.status != 'cancelled') THEN 1 ELSE 0 END), 0), "
+        "COALESCE(SUM(CASE WHEN appointment.status = 'scheduled' THEN 1 ELSE 0 END), 0) "
+        "FROM doctor LEFT OUTER JOIN appointment ON appointment.doctor_id = doctor.id "
+        "GROUP BY doctor.id, doctor.name, doctor.specialization, doctor.experience, doctor.available_days, "
+        "doctor.per_minute_price"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('doctor_summary', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_summary_total_bookings')
+        batch_op.drop_index('ix_doctor_summary_specialization_name')
+        batch_op.drop_index('ix_doctor_summary_per_minute_price')
+        batch_op.drop_index('ix_doctor_summary_next_free_date')
+        batch_op.drop_index('ix_doctor_summary_name')
+        batch_op.drop_index('ix_doctor_summary_experience')
+
+    op.drop_table('doctor_summary')
@@ -0,0 +1,26 @@
+"""Index appointment by status and date for the completion sweep
+
+Revision ID: 5a7c9e1b3d60
+Revises: 3c9e5b7d1f48
+Create Date: 2026-10-18 23:52:37.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7c9e1b3d60'
+down_revision = '3c9e5b7d1f48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_status_date', ['status', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_status_date')
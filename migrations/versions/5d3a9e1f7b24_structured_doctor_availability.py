@@ -0,0 +1,109 @@
+"""Structured doctor availability
+
+Revision ID: 5d3a9e1f7b24
+Revises: 2b8f4d6a0c13
+Create Date: 2026-10-18 11:26:52.104377
+
+"""
+import logging
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d3a9e1f7b24'
+down_revision = '2b8f4d6a0c13'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# A frozen copy of availability.parse_available_days as of this revision, so the
+# migration keeps working however the application module changes later
+DEFAULT_WEEKDAYS = [0, 1, 2, 3, 4]
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+ALIASES = {
+    'weekdays': DEFAULT_WEEKDAYS, 'weekday': DEFAULT_WEEKDAYS, 'weekends': [5, 6], 'weekend': [5, 6],
+    'daily': list(range(7)), 'everyday': list(range(7)), 'every day': list(range(7)),
+    'all days': list(range(7)), 'all week': list(range(7)),
+}
+TIME = r'\d{1,2}(?:[:.]\d{2})?\s*(?:[ap]\.?m\.?|hrs|h)?'
+TIME_RANGE = re.compile(rf'(?<![\w:]){TIME}(?:\s*(?:-|–|\bto\b)\s*{TIME})?(?![\w:])')
+RANGE_SEPARATOR = re.compile(r'\s*(?:-|–|\bto\b)\s*')
+LIST_SEPARATOR = re.compile(r'[,/;&]|\band\b')
+NOISE = re.compile(r'[():.]|\b(?:from|between|only)\b')
+
+
+def _weekday(word):
+    word = word.strip().lower()
+    if word.endswith('s') and word[:-1] in WEEKDAY_NAMES:
+        word = word[:-1]
+    if len(word) < 3:
+        return None
+    for index, name in enumerate(WEEKDAY_NAMES):
+        if name.startswith(word):
+            return index
+    return None
+
+
+def parse_available_days(text):
+    days = set()
+    cleaned = NOISE.sub(' ', TIME_RANGE.sub(' ', (text or '').lower()))
+    for part in LIST_SEPARATOR.split(cleaned):
+        part = ' '.join(part.split())
+        if not part:
+            continue
+        if part in ALIASES:
+            days.update(ALIASES[part])
+            continue
+        bounds = RANGE_SEPARATOR.split(part)
+        if len(bounds) == 2:
+            start, end = _weekday(bounds[0]), _weekday(bounds[1])
+            if start is None or end is None:
+                return []
+            day = start
+            days.add(day)
+            while day != end:
+                day = (day + 1) % 7
+                days.add(day)
+            continue
+        if len(bounds) > 2:
+            return []
+        for word in part.split():
+            day = _weekday(word)
+            if day is None:
+                return []
+            days.add(day)
+    return sorted(days)
+
+
+def upgrade():
+    availability = op.create_table('doctor_availability',
+    sa.Column('weekday', sa.SmallInteger(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+    sa.PrimaryKeyConstraint('weekday', 'doctor_id')
+    )
+    with op.batch_alter_table('doctor_availability', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_availability_doctor_id', ['doctor_id'], unique=False)
+
+    connection = op.get_bind()
+    rows = []
+    for doctor_id, available_days in connection.execute(sa.text('SELECT id, available_days FROM doctor')):
+        weekdays = parse_available_days(available_days)
+        if not weekdays:
+            # Text we cannot parse falls back to the registration default of Mon-Fri
+            logger.warning(f'Doctor {doctor_id}: could not understand available days "{available_days}", using Mon-Fri')
+            weekdays = DEFAULT_WEEKDAYS
+        rows.extend({'weekday': weekday, 'doctor_id': doctor_id} for weekday in weekdays)
+    if rows:
+        op.bulk_insert(availability, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('doctor_availability', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_availability_doctor_id')
+
+    op.drop_table('doctor_availability')
@@ -0,0 +1,26 @@
+"""Add chat history timestamp index for exports
+
+Revision ID: 6e2a8c4f0b17
+Revises: 1b7d9f3e5a24
+Create Date: 2026-10-18 19:05:47.330918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2a8c4f0b17'
+down_revision = '1b7d9f3e5a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat_history', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_history_timestamp', ['timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_history_timestamp')
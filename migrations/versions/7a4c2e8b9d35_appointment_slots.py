@@ -0,0 +1,61 @@
+"""Normalised appointment slots with per-doctor uniqueness
+
+Revision ID: 7a4c2e8b9d35
+Revises: 5d3a9e1f7b24
+Create Date: 2026-10-18 12:41:07.882914
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4c2e8b9d35'
+down_revision = '5d3a9e1f7b24'
+branch_labels = None
+depends_on = None
+
+
+# A copy of slots.parse_time as of this revision; importing slots would pull in the models
+def parse_time(value):
+    value = (value or '').strip().upper()
+    for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p', '%I %p'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute
+    raise ValueError(f'Unrecognised time "{value}"')
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('slot', sa.SmallInteger(), nullable=True))
+
+    connection = op.get_bind()
+    appointment = sa.table('appointment', sa.column('id', sa.Integer), sa.column('slot', sa.SmallInteger))
+    taken = set()
+    rows = connection.execute(sa.text(
+        "SELECT id, doctor_id, date, time FROM appointment WHERE status IS NULL OR status != 'cancelled' ORDER BY id"
+    ))
+    for appointment_id, doctor_id, date, time in rows.fetchall():
+        try:
+            slot = parse_time(time)
+        except ValueError:
+            continue
+        # Existing double bookings keep the earliest appointment on the slot; later ones stay unslotted
+        if (doctor_id, date, slot) in taken:
+            continue
+        taken.add((doctor_id, date, slot))
+        connection.execute(appointment.update().where(appointment.c.id == appointment_id).values(slot=slot))
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_appointment_doctor_date_slot', ['doctor_id', 'date', 'slot'])
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_appointment_doctor_date_slot', type_='unique')
+        batch_op.drop_column('slot')
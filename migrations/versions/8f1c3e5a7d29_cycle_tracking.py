@@ -0,0 +1,54 @@
+"""Add period log and cycle predictions
+
+Revision ID: 8f1c3e5a7d29
+Revises: 6e2a8c4f0b17
+Create Date: 2026-10-18 20:12:33.604187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f1c3e5a7d29'
+down_revision = '6e2a8c4f0b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('period_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'start_date', name='uq_period_log_user_id_start_date')
+    )
+    op.create_table('cycle_prediction',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('cycle_count', sa.Integer(), nullable=False),
+    sa.Column('mean_length', sa.Float(), nullable=False),
+    sa.Column('std_length', sa.Float(), nullable=True),
+    sa.Column('last_start', sa.Date(), nullable=False),
+    sa.Column('next_start', sa.Date(), nullable=False),
+    sa.Column('fertile_start', sa.Date(), nullable=False),
+    sa.Column('fertile_end', sa.Date(), nullable=False),
+    sa.Column('stale', sa.Boolean(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('cycle_prediction', schema=None) as batch_op:
+        batch_op.create_index('ix_cycle_prediction_next_start', ['next_start'], unique=False)
+        batch_op.create_index('ix_cycle_prediction_stale', ['stale'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cycle_prediction', schema=None) as batch_op:
+        batch_op.drop_index('ix_cycle_prediction_stale')
+        batch_op.drop_index('ix_cycle_prediction_next_start')
+
+    op.drop_table('cycle_prediction')
+    op.drop_table('period_log')
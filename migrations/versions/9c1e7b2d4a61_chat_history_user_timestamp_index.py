@@ -0,0 +1,26 @@
+"""Index chat history by user and timestamp
+
+Revision ID: 9c1e7b2d4a61
+Revises: 4f60aecff82d
+Create Date: 2026-10-18 09:12:40.215734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1e7b2d4a61'
+down_revision = '4f60aecff82d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat_history', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_history_user_id_timestamp', ['user_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_history_user_id_timestamp')
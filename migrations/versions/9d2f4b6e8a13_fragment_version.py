@@ -0,0 +1,28 @@
+"""Shared fragment cache tag versions
+
+Revision ID: 9d2f4b6e8a13
+Revises: 5a7c9e1b3d60
+Create Date: 2026-10-19 09:14:52.381026
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2f4b6e8a13'
+down_revision = '5a7c9e1b3d60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('fragment_version',
+    sa.Column('tag', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tag')
+    )
+
+
+def downgrade():
+    op.drop_table('fragment_version')
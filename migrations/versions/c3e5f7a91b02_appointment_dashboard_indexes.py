@@ -0,0 +1,28 @@
+"""Add appointment dashboard indexes
+
+Revision ID: c3e5f7a91b02
+Revises: 7a4c2e8b9d35
+Create Date: 2026-10-18 13:55:31.407118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5f7a91b02'
+down_revision = '7a4c2e8b9d35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_user_id_date', ['user_id', 'date'], unique=False)
+        batch_op.create_index('ix_appointment_date', ['date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_date')
+        batch_op.drop_index('ix_appointment_user_id_date')
@@ -0,0 +1,62 @@
+"""Add appointment reminder queue
+
+Revision ID: f4a6c8e0d953
+Revises: e8d0b4c6f217
+Create Date: 2026-10-18 16:20:15.938402
+
+"""
+from datetime import datetime, time, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a6c8e0d953'
+down_revision = 'e8d0b4c6f217'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    reminder = op.create_table('appointment_reminder',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('appointment_id', 'kind', name='uq_appointment_reminder_appointment_kind')
+    )
+    with op.batch_alter_table('appointment_reminder', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_reminder_status_due_at', ['status', 'due_at'], unique=False)
+        batch_op.create_index('ix_appointment_reminder_claim_token', ['claim_token'], unique=False)
+
+    # Queue reminders for upcoming appointments that were booked before this table existed
+    now = datetime.now()
+    connection = op.get_bind()
+    rows = []
+    upcoming = connection.execute(sa.text(
+        "SELECT id, date, slot FROM appointment "
+        "WHERE status = 'scheduled' AND slot IS NOT NULL AND date >= :today"
+    ), {'today': now.date()})
+    for appointment_id, date, slot in upcoming:
+        if isinstance(date, str):
+            date = datetime.strptime(date, '%Y-%m-%d').date()
+        start = datetime.combine(date, time(slot // 60, slot % 60))
+        for kind, offset in (('24h', timedelta(hours=24)), ('1h', timedelta(hours=1))):
+            if start - offset > now:
+                rows.append({'appointment_id': appointment_id, 'kind': kind, 'due_at': start - offset, 'status': 'pending'})
+    if rows:
+        op.bulk_insert(reminder, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment_reminder', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_reminder_claim_token')
+        batch_op.drop_index('ix_appointment_reminder_status_due_at')
+
+    op.drop_table('appointment_reminder')
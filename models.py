@@ -1,28 +1,34 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hasher
+from availability import parse_available_days
 
 db = SQLAlchemy()
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), nullable=False)
     due_date = db.Column(db.Date, nullable=True)
     appointments = db.relationship('Appointment', backref='patient', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not hasher.verify(self.password_hash, password):
+            return False
+        # Upgrade hashes made with an older method or cost; saved with the caller's next commit
+        if hasher.needs_rehash(self.password_hash):
+            self.password_hash = hasher.hash(password)
+        return True
 
 class Doctor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
     name = db.Column(db.String(100), nullable=False)
     specialization = db.Column(db.String(100), nullable=False)
     experience = db.Column(db.Integer, nullable=False)
@@ -30,12 +36,45 @@ class Doctor(db.Model):
     available_days = db.Column(db.String(100), nullable=False)
     per_minute_price = db.Column(db.Float, nullable=False, default=0.0)
     appointments = db.relationship('Appointment', backref='doctor', lazy=True)
+    availability = db.relationship('DoctorAvailability', backref='doctor', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not hasher.verify(self.password_hash, password):
+            return False
+        # Upgrade hashes made with an older method or cost; saved with the caller's next commit
+        if hasher.needs_rehash(self.password_hash):
+            self.password_hash = hasher.hash(password)
+        return True
+
+    def set_available_days(self, available_days):
+        weekdays = parse_available_days(available_days)
+        if not weekdays:
+            raise ValueError(f'Could not understand available days "{available_days}"')
+        self.available_days = available_days
+        # Only touch rows that change so an existing (weekday, doctor_id) key is never re-inserted
+        current = {slot.weekday: slot for slot in self.availability}
+        for weekday, slot in current.items():
+            if weekday not in weekdays:
+                self.availability.remove(slot)
+        for weekday in weekdays:
+            if weekday not in current:
+                self.availability.append(DoctorAvailability(weekday=weekday))
+
+    def is_available_on(self, day):
+        return db.session.get(DoctorAvailability, (day.weekday(), self.id)) is not None
+
+class DoctorAvailability(db.Model):
+    __tablename__ = 'doctor_availability'
+    # weekday leads the primary key so "who works on day X" is an index range scan
+    weekday = db.Column(db.SmallInteger, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_doctor_availability_doctor_id', 'doctor_id'),
+    )
 
 class Appointment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -43,9 +82,21 @@ class Appointment(db.Model):
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     time = db.Column(db.String(20), nullable=False)
+    # Start of the booked slot in minutes since midnight; cleared when an appointment
+    # is cancelled so the unique constraint releases the slot
+    slot = db.Column(db.SmallInteger, nullable=True)
     status = db.Column(db.String(20), default='scheduled')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # The unique constraint also serves as the (doctor_id, date) index for doctor dashboards
+    __table_args__ = (
+        db.UniqueConstraint('doctor_id', 'date', 'slot', name='uq_appointment_doctor_date_slot'),
+        db.Index('ix_appointment_user_id_date', 'user_id', 'date'),
+        db.Index('ix_appointment_date', 'date'),
+        # Lets the completion sweep read only the scheduled appointments before today
+        db.Index('ix_appointment_status_date', 'status', 'date'),
+    )
+
 class ChatHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -54,3 +105,122 @@ class ChatHistory(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship('User', backref=db.backref('chats', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_chat_history_user_id_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_chat_history_timestamp', 'timestamp'),
+    )
+
+class SmsOutbox(db.Model):
+    __tablename__ = 'sms_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    to = db.Column(db.String(20), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_sms_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_sms_outbox_claim_token', 'claim_token'),
+    )
+
+class AppointmentReminder(db.Model):
+    __tablename__ = 'appointment_reminder'
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    # Local time at which the reminder should reach the patient
+    due_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    claim_token = db.Column(db.String(32), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    appointment = db.relationship('Appointment', backref=db.backref('reminders', lazy=True))
+
+    __table_args__ = (
+        db.UniqueConstraint('appointment_id', 'kind', name='uq_appointment_reminder_appointment_kind'),
+        db.Index('ix_appointment_reminder_status_due_at', 'status', 'due_at'),
+        db.Index('ix_appointment_reminder_claim_token', 'claim_token'),
+    )
+
+class PeriodLog(db.Model):
+    __tablename__ = 'period_log'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('period_logs', lazy=True))
+
+    # Also the (user_id, start_date) index the prediction engine reads through
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'start_date', name='uq_period_log_user_id_start_date'),
+    )
+
+class CyclePrediction(db.Model):
+    __tablename__ = 'cycle_prediction'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    cycle_count = db.Column(db.Integer, nullable=False)
+    mean_length = db.Column(db.Float, nullable=False)
+    std_length = db.Column(db.Float, nullable=True)
+    last_start = db.Column(db.Date, nullable=False)
+    next_start = db.Column(db.Date, nullable=False)
+    fertile_start = db.Column(db.Date, nullable=False)
+    fertile_end = db.Column(db.Date, nullable=False)
+    # Set when a new period is logged; the next batch run recomputes the row
+    stale = db.Column(db.Boolean, nullable=False, default=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_cycle_prediction_stale', 'stale'),
+        db.Index('ix_cycle_prediction_next_start', 'next_start'),
+    )
+
+class DoctorSummary(db.Model):
+    """One row per doctor with everything the directory lists and sorts by.
+
+    Kept current by doctor_directory as appointments and doctors change, and
+    rebuilt from scratch with ``flask directory-rebuild``.
+    """
+    __tablename__ = 'doctor_summary'
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id', ondelete='CASCADE'), primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    specialization = db.Column(db.String(100), nullable=False)
+    experience = db.Column(db.Integer, nullable=False)
+    available_days = db.Column(db.String(100), nullable=False)
+    per_minute_price = db.Column(db.Float, nullable=False, default=0.0)
+    # Appointments that were not cancelled, and those still scheduled
+    total_bookings = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_count = db.Column(db.Integer, nullable=False, default=0)
+    # First working day with a free slot within the booking horizon; NULL when fully booked
+    next_free_date = db.Column(db.Date, nullable=True)
+    # The day next_free_date was worked out on
+    refreshed_on = db.Column(db.Date, nullable=True)
+
+    id = db.synonym('doctor_id')
+
+    __table_args__ = (
+        db.Index('ix_doctor_summary_name', 'name'),
+        db.Index('ix_doctor_summary_specialization_name', 'specialization', 'name'),
+        db.Index('ix_doctor_summary_experience', 'experience'),
+        db.Index('ix_doctor_summary_per_minute_price', 'per_minute_price'),
+        db.Index('ix_doctor_summary_next_free_date', 'next_free_date'),
+        db.Index('ix_doctor_summary_total_bookings', 'total_bookings'),
+    )
+
+class FragmentVersion(db.Model):
+    """Version counter per fragment cache tag, shared by every worker.
+
+    Bumped in the transaction that changes the tagged rows, so no worker can
+    serve a fragment rendered before a committed change.
+    """
+    __tablename__ = 'fragment_version'
+    tag = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
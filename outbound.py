@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from metrics import count_rejection, observe_outbound
+
+logger = logging.getLogger(__name__)
+
+_EXHAUSTED = object()
+
+
+class OutboundError(Exception):
+    pass
+
+
+class CircuitOpenError(OutboundError):
+    pass
+
+
+class DependencyBusyError(OutboundError):
+    pass
+
+
+class DependencyTimeoutError(OutboundError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single trial call through once reset_after has passed."""
+
+    def __init__(self, failure_threshold=5, reset_after=30):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_after or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class Dependency:
+    """Runs calls to one upstream service on its own bounded thread pool.
+
+    At most ``max_concurrency`` calls run at once and ``max_queue`` more may
+    wait; anything beyond that fails fast instead of tying up a request
+    thread, as do calls made while the circuit breaker is open.
+    """
+
+    def __init__(self, name, max_concurrency=4, max_queue=16, timeout=30, failure_threshold=5, reset_after=30):
+        self.name = name
+        self._executor = None
+        self.configure(max_concurrency, max_queue, timeout, failure_threshold, reset_after)
+
+    def configure(self, max_concurrency=4, max_queue=16, timeout=30, failure_threshold=5, reset_after=30):
+        """Resize the pool and breaker; meant for start-up, before calls are made."""
+        previous = self._executor
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self._slots = threading.BoundedSemaphore(max_concurrency + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f'outbound-{self.name}')
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def _submit(self, fn, *args, **kwargs):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            count_rejection(self.name, 'busy')
+            raise DependencyBusyError(f'{self.name} has too many calls in flight')
+        if not self.breaker.allow():
+            slots.release()
+            count_rejection(self.name, 'circuit_open')
+            raise CircuitOpenError(f'{self.name} circuit is open')
+
+        def run():
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = fn(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                observe_outbound(self.name, time.perf_counter() - started, outcome)
+                slots.release()
+
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            slots.release()
+            raise
+        return future
+
+    def _on_done(self, future):
+        # exception() raises CancelledError on a cancelled future, so check that first
+        if future.cancelled():
+            self.breaker.record_failure()
+        elif future.exception() is not None:
+            self.breaker.record_failure()
+            logger.error(f"{self.name} call failed: {future.exception()}")
+        else:
+            self.breaker.record_success()
+
+    def call(self, fn, *args, timeout=None, **kwargs):
+        """Run ``fn`` on the dependency's pool and wait at most ``timeout`` seconds for it."""
+        future = self._submit(fn, *args, **kwargs)
+        try:
+            result = future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            # The worker keeps running, but the request thread is released
+            self.breaker.record_failure()
+            count_rejection(self.name, 'timeout')
+            raise DependencyTimeoutError(f'{self.name} call timed out')
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def submit(self, fn, *args, **kwargs):
+        """Fire-and-forget variant of call(); failures are logged and counted by the breaker."""
+        future = self._submit(fn, *args, **kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def iterate(self, fn, *args, **kwargs):
+        """Call a streaming ``fn`` and pull each item through the pool under the same timeout."""
+        iterator = self.call(lambda: iter(fn(*args, **kwargs)))
+        while True:
+            item = self.call(next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request, session
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, FragmentVersion
+
+
+class _LRU:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class PageCache:
+    """Whole-response cache for pages that render the same for every anonymous visitor.
+
+    Logged-in visitors and requests with pending flash messages always get a
+    fresh render, since base.html shows both. Responses carry an ETag and
+    Last-Modified so browsers revalidate with a cheap 304.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.configure(max_entries, ttl)
+
+    def configure(self, max_entries=256, ttl=300):
+        self._pages = _LRU(max_entries, ttl)
+
+    def cacheable(self):
+        return request.method == 'GET' and 'user_id' not in session and '_flashes' not in session
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.cacheable():
+                return view(*args, **kwargs)
+            key = request.full_path
+            page = self._pages.get(key)
+            if page is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                page = (body, response.mimetype, hashlib.sha1(body).hexdigest(),
+                        datetime.now(timezone.utc).replace(microsecond=0))
+                self._pages.set(key, page)
+            body, mimetype, etag, last_modified = page
+            response = make_response(body)
+            response.mimetype = mimetype
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Always revalidate: the same URL renders differently once the visitor logs in
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response.make_conditional(request)
+        return wrapper
+
+    def clear(self):
+        self._pages.clear()
+
+
+class FragmentCache:
+    """Rendered template fragments keyed by the data they show.
+
+    Every fragment is stored under a set of tags such as ``('user', 7)``;
+    bumping a tag's version makes every fragment stored under it miss. The
+    versions live in the fragment_version table and are bumped in the same
+    transaction as the change, so every worker sees a committed change on
+    its next lookup. That costs one primary-key read per lookup.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.configure(max_entries, ttl)
+
+    def configure(self, max_entries=10000, ttl=60):
+        self._fragments = _LRU(max_entries, ttl)
+
+    @staticmethod
+    def _name(tag):
+        return ':'.join(str(part) for part in tag)
+
+    def _versions(self, tags):
+        names = [self._name(tag) for tag in tags]
+        # Always the primary: a replica could still hold the version from before a change
+        stored = dict(db.session.execute(
+            select(FragmentVersion.tag, FragmentVersion.version).where(FragmentVersion.tag.in_(names))).all())
+        return tuple(stored.get(name, 0) for name in names)
+
+    def fetch(self, key, tags, render):
+        """Return the cached fragment for ``key``, or ``render()`` it and store it under the current versions."""
+        full_key = (key, self._versions(tags))
+        fragment = self._fragments.get(full_key)
+        if fragment is None:
+            fragment = render()
+            self._fragments.set(full_key, fragment)
+        return fragment
+
+    def invalidate(self, connection, tags):
+        """Bump the versions of ``tags`` on ``connection``, inside the caller's transaction."""
+        table = FragmentVersion.__table__
+        for name in sorted({self._name(tag) for tag in tags}):
+            bump = table.update().where(table.c.tag == name).values(version=table.c.version + 1)
+            if connection.execute(bump).rowcount:
+                continue
+            try:
+                with connection.begin_nested():
+                    connection.execute(table.insert().values(tag=name, version=1))
+            except IntegrityError:
+                # Another transaction created the row first
+                connection.execute(bump)
+
+    def watch(self, tags_for):
+        """Invalidate the tags ``tags_for(instance)`` returns for rows changed in each flush."""
+        def bump(session, flush_context):
+            tags = set()
+            for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+                tags.update(tags_for(instance))
+            if tags:
+                self.invalidate(session.connection(), tags)
+
+        event.listen(Session, 'after_flush', bump)
@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HashingBusyError(Exception):
+    pass
+
+
+def canonical_method(method):
+    """The method string werkzeug stores at the front of a hash, with default parameters filled in."""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return DEFAULT_METHOD
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    """Hashes and checks passwords on a process pool so slow key derivation never runs on a request thread.
+
+    ``method`` is a werkzeug method string such as ``scrypt:16384:8:1`` or
+    ``pbkdf2:sha256:600000``, so both the algorithm and its cost are
+    configurable. At most ``workers + max_pending`` hashes are in flight;
+    beyond that callers get HashingBusyError instead of queueing without
+    bound. ``workers=0`` hashes inline, which is handy for CLI scripts.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=None, max_pending=None, timeout=30):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method=DEFAULT_METHOD, workers=None, max_pending=None, timeout=30):
+        """Change the method and pool size; a running pool is shut down and rebuilt on the next hash."""
+        self.method = canonical_method(method)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + (self.workers * 4 if max_pending is None else max_pending))
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Workers are spawned rather than forked, since forking a threaded server process is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _discard(self, executor):
+        """Forget a broken pool so the next call builds a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingBusyError('Too many password hashes in flight')
+        executor = self._pool()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            slots.release()
+            self._discard(executor)
+            raise HashingBusyError('The password hashing pool was broken and is being restarted')
+        except Exception:
+            slots.release()
+            raise
+        # The slot is held until the worker finishes, even if this caller stops waiting
+        future.add_done_callback(lambda f: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingBusyError(f'Password hashing took longer than {self.timeout}s')
+        except BrokenProcessPool:
+            # A worker died; every later call on this pool would fail the same way
+            self._discard(executor)
+            raise HashingBusyError('The password hashing pool was broken and is being restarted')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash a batch of passwords across all workers, for bulk imports.
+
+        This bypasses the in-flight limit, so keep batches to a few hundred
+        to leave room for logins sharing the pool.
+        """
+        passwords = list(passwords)
+        if not self.workers:
+            return [generate_password_hash(password, self.method) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        executor = self._pool()
+        try:
+            return list(executor.map(generate_password_hash, passwords, repeat(self.method, len(passwords)),
+                                     chunksize=chunksize, timeout=self.timeout * len(passwords)))
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def verify(self, password_hash, password):
+        if not password_hash or password is None:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+class LoginThrottle:
+    """Sliding-window limit on failed logins per IP and per email, held in memory.
+
+    Checked before any hashing so brute-force traffic is turned away without
+    costing CPU. Only the most recently used ``max_keys`` keys are tracked.
+    """
+
+    def __init__(self, max_per_ip=20, max_per_email=5, window=300, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self.configure(max_per_ip, max_per_email, window)
+
+    def configure(self, max_per_ip=20, max_per_email=5, window=300):
+        self.limits = {'ip': max_per_ip, 'email': max_per_email}
+        self.window = window
+        # The per-key deques are bounded by the old limits
+        with self._lock:
+            self._failures = OrderedDict()
+
+    def _keys(self, ip, email):
+        keys = []
+        if ip:
+            keys.append(('ip', ip))
+        if email:
+            keys.append(('email', email.strip().lower()))
+        return keys
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, ip, email):
+        """Seconds until another attempt is allowed, or 0 if one is allowed now."""
+        now = time.monotonic()
+        wait = 0
+        with self._lock:
+            for key in self._keys(ip, email):
+                failures = self._recent(key, now)
+                if failures and len(failures) >= self.limits[key[0]]:
+                    wait = max(wait, failures[0] + self.window - now)
+        return wait
+
+    def record_failure(self, ip, email):
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys(ip, email):
+                failures = self._recent(key, now)
+                if failures is None:
+                    failures = self._failures[key] = deque(maxlen=self.limits[key[0]])
+                failures.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def reset(self, email):
+        # The IP count is kept so one valid account can't be used to clear it
+        with self._lock:
+            for key in self._keys(None, email):
+                self._failures.pop(key, None)
+
+
+# Sized from the app config by services.init_services
+hasher = PasswordHasher()
@@ -0,0 +1,145 @@
+import logging
+import time
+import uuid
+from datetime import datetime, time as time_of_day, timedelta
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
+from doctor_directory import directory
+from models import db, Appointment, AppointmentReminder
+from sms import enqueue_sms
+
+logger = logging.getLogger(__name__)
+
+REMINDER_OFFSETS = {
+    '24h': timedelta(hours=24),
+    '1h': timedelta(hours=1),
+}
+
+REMINDER_MESSAGES = {
+    '24h': "Reminder: your appointment with Dr. {doctor} is tomorrow, {date} at {time}.",
+    '1h': "Reminder: your appointment with Dr. {doctor} starts in an hour, at {time}.",
+}
+
+
+def appointment_start(appointment):
+    if appointment.slot is None:
+        return None
+    return datetime.combine(appointment.date, time_of_day(appointment.slot // 60, appointment.slot % 60))
+
+
+def schedule_reminders(appointment, now=None):
+    """Queue the 24h and 1h reminders for a new appointment, skipping any that are already due."""
+    start = appointment_start(appointment)
+    if start is None:
+        return []
+    now = now or datetime.now()
+    reminders = []
+    for kind, offset in REMINDER_OFFSETS.items():
+        if start - offset > now:
+            reminder = AppointmentReminder(appointment_id=appointment.id, kind=kind, due_at=start - offset)
+            db.session.add(reminder)
+            reminders.append(reminder)
+    return reminders
+
+
+class ReminderScheduler:
+    """Moves reminders that fall due within ``window`` seconds into the SMS outbox.
+
+    Only the (status, due_at) index range for the window is read. Rows are
+    claimed with a conditional UPDATE and a claim token, so several schedulers
+    can run at once; claims older than ``lease`` seconds are retried. Each
+    message is queued with the reminder's due time, so the SMS dispatcher
+    sends it on schedule even when it was picked up early.
+    """
+
+    def __init__(self, window=300, batch_size=200, lease=300):
+        self.window = window
+        self.batch_size = batch_size
+        self.lease = lease
+
+    def claim_due(self, now):
+        horizon = now + timedelta(seconds=self.window)
+        claimable = or_(
+            and_(AppointmentReminder.status == 'pending', AppointmentReminder.due_at <= horizon),
+            and_(AppointmentReminder.status == 'claimed', AppointmentReminder.claimed_at < now - timedelta(seconds=self.lease)),
+        )
+        ids = [row.id for row in db.session.query(AppointmentReminder.id)
+               .filter(claimable)
+               .order_by(AppointmentReminder.due_at)
+               .limit(self.batch_size)]
+        if not ids:
+            return []
+
+        token = uuid.uuid4().hex
+        db.session.query(AppointmentReminder).filter(AppointmentReminder.id.in_(ids), claimable).update(
+            {'status': 'claimed', 'claim_token': token, 'claimed_at': now},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return (AppointmentReminder.query
+                .options(joinedload(AppointmentReminder.appointment).joinedload(Appointment.patient),
+                         joinedload(AppointmentReminder.appointment).joinedload(Appointment.doctor))
+                .filter_by(claim_token=token, status='claimed')
+                .all())
+
+    def dispatch_due(self, now=None):
+        now = now or datetime.now()
+        reminders = self.claim_due(now)
+        sent_ids, skipped_ids = [], []
+        for reminder in reminders:
+            appointment = reminder.appointment
+            start = appointment_start(appointment)
+            if appointment.status != 'scheduled' or start is None or start <= now:
+                skipped_ids.append(reminder.id)
+                continue
+            body = REMINDER_MESSAGES[reminder.kind].format(
+                doctor=appointment.doctor.name,
+                date=appointment.date.strftime('%b %d'),
+                time=appointment.time
+            )
+            # Outbox times are UTC; shift the local due time by the current offset
+            send_at = reminder.due_at + (datetime.utcnow() - datetime.now())
+            enqueue_sms(appointment.patient.phone, body, appointment_id=appointment.id, send_at=send_at)
+            sent_ids.append(reminder.id)
+
+        token = reminders[0].claim_token if reminders else None
+        for status, ids in (('queued', sent_ids), ('skipped', skipped_ids)):
+            if not ids:
+                continue
+            updated = db.session.query(AppointmentReminder).filter(
+                AppointmentReminder.id.in_(ids), AppointmentReminder.claim_token == token
+            ).update({'status': status, 'claim_token': None}, synchronize_session=False)
+            if updated != len(ids):
+                # The lease ran out and another dispatcher holds some of these now; drop the queued SMS with
+                # our updates and leave the whole batch to it, so no reminder is sent twice
+                db.session.rollback()
+                logger.warning(f"Lost the claim on {len(ids) - updated} of {len(ids)} reminders; leaving the batch")
+                return 0, 0
+        db.session.commit()
+        return len(sent_ids), len(skipped_ids)
+
+    def complete_past_appointments(self, now=None):
+        """Mark scheduled appointments from earlier days as completed in one UPDATE over the (status, date) index."""
+        today = (now or datetime.now()).date()
+        past = db.session.query(Appointment).filter(Appointment.status == 'scheduled', Appointment.date < today)
+        doctor_ids = [doctor_id for (doctor_id,) in past.with_entities(Appointment.doctor_id).distinct()]
+        completed = past.update({'status': 'completed'}, synchronize_session=False)
+        # A bulk UPDATE skips the session events that keep doctor summaries current
+        if doctor_ids:
+            directory.refresh(doctor_ids, commit=False)
+        db.session.commit()
+        return completed
+
+    def run(self, interval=60, once=False):
+        while True:
+            queued, skipped = self.dispatch_due()
+            completed = self.complete_past_appointments()
+            if queued or skipped or completed:
+                logger.info(f"Queued {queued} reminders, skipped {skipped}, completed {completed} appointments")
+            if once:
+                return
+            # Keep going immediately while there is a backlog larger than one batch
+            if queued + skipped < self.batch_size:
+                time.sleep(interval)
@@ -0,0 +1,140 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+TOKEN = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a an and are am as at be been but by can could do does did for from had has have how i i'm if in into is it
+its me my of on or should so that the their them there these this to was we were what when where which who
+why will with would you your please tell about any some during while
+""".split())
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        # Crude plural folding so "eggs" and "egg" land on the same term
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def normalize(text):
+    return ' '.join(TOKEN.findall(text.lower()))
+
+
+class ResponseCache:
+    """Caches model answers by normalised prompt, with TF-IDF near-duplicate lookup.
+
+    Prompts with fewer than ``min_terms`` content words are never cached so
+    context-dependent follow-ups such as "what about tea?" are always sent
+    to the model.
+    """
+
+    def __init__(self, max_entries=5000, ttl=24 * 3600, threshold=0.85, min_terms=2, max_candidates=200):
+        self.configure(max_entries, ttl, threshold)
+        self.min_terms = min_terms
+        self.max_candidates = max_candidates
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._postings = {}
+        self._lock = threading.Lock()
+
+    def configure(self, max_entries=5000, ttl=24 * 3600, threshold=0.85):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+
+    def _idf(self, term):
+        return math.log((len(self._entries) + 1) / (len(self._postings.get(term, ())) + 1)) + 1
+
+    def _vector(self, counts):
+        vector = {term: count * self._idf(term) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return vector, norm
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        for term in entry['terms']:
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+
+    def get(self, prompt):
+        key = normalize(prompt)
+        terms = Counter(tokenize(prompt))
+        if sum(terms.values()) < self.min_terms:
+            return None
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry['created_at'] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry['response']
+                self._drop(key)
+
+            overlap = Counter()
+            for term in terms:
+                for candidate in self._postings.get(term, ()):
+                    overlap[candidate] += 1
+
+            query, query_norm = self._vector(terms)
+            best_key, best_score = None, 0.0
+            for candidate, _ in overlap.most_common(self.max_candidates):
+                entry = self._entries[candidate]
+                if now - entry['created_at'] >= self.ttl:
+                    continue
+                vector, norm = self._vector(entry['terms'])
+                if not norm or not query_norm:
+                    continue
+                score = sum(weight * vector.get(term, 0.0) for term, weight in query.items()) / (norm * query_norm)
+                if score > best_score:
+                    best_key, best_score = candidate, score
+
+            if best_key is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best_key)
+                self.near_hits += 1
+                return self._entries[best_key]['response']
+
+            self.misses += 1
+            return None
+
+    def set(self, prompt, response):
+        key = normalize(prompt)
+        terms = Counter(tokenize(prompt))
+        if sum(terms.values()) < self.min_terms:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {'terms': terms, 'response': response, 'created_at': time.time()}
+            for term in terms:
+                self._postings.setdefault(term, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'exact_hits': self.exact_hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,198 @@
+import os
+import threading
+
+from sqlalchemy import inspect
+
+from chat_history import ChatHistoryBuffer, ConversationContext
+from doctor_directory import directory as doctor_directory
+from metrics import cache_lookups
+from models import Appointment, Doctor
+from outbound import Dependency
+from page_cache import FragmentCache, PageCache
+from passwords import DEFAULT_METHOD, LoginThrottle, hasher
+from response_cache import ResponseCache
+from sms import FakeSender, TwilioSender
+from translation import Translator, TranslationCache
+
+# Shared, process-wide helpers for the views. Everything here is cheap to build;
+# the Gemini and Twilio SDKs are only imported when a client is first needed.
+# They start with defaults and are sized from the app config by init_services().
+
+# setting -> (parser, default); read from the environment by services_config()
+SETTINGS = {
+    'GEMINI_MAX_CONCURRENCY': (int, 8),
+    'GEMINI_MAX_QUEUE': (int, 16),
+    'GEMINI_TIMEOUT': (float, 60),
+    'TRANSLATOR_MAX_CONCURRENCY': (int, 8),
+    'TRANSLATOR_MAX_QUEUE': (int, 16),
+    'TRANSLATOR_TIMEOUT': (float, 10),
+    'TWILIO_MAX_CONCURRENCY': (int, 4),
+    'TWILIO_MAX_QUEUE': (int, 16),
+    'TWILIO_TIMEOUT': (float, 15),
+    'TRANSLATION_CACHE_SIZE': (int, 2048),
+    'TRANSLATION_CACHE_TTL': (int, 7 * 24 * 3600),
+    'TRANSLATION_CACHE_DB': (str, None),
+    'CHAT_HISTORY_FLUSH_SIZE': (int, 50),
+    'CHAT_HISTORY_FLUSH_INTERVAL': (float, 2.0),
+    'CHAT_HISTORY_MAX_RETRIES': (int, 3),
+    'CHAT_CONTEXT_TOKEN_BUDGET': (int, 2000),
+    'CHAT_CONTEXT_MAX_TURNS': (int, 20),
+    'CHAT_CONTEXT_MAX_AGE': (int, 30 * 60),
+    'RESPONSE_CACHE_SIZE': (int, 5000),
+    'RESPONSE_CACHE_TTL': (int, 24 * 3600),
+    'RESPONSE_CACHE_THRESHOLD': (float, 0.85),
+    'LOGIN_MAX_ATTEMPTS_PER_IP': (int, 20),
+    'LOGIN_MAX_ATTEMPTS_PER_EMAIL': (int, 5),
+    'LOGIN_ATTEMPT_WINDOW': (int, 300),
+    'PAGE_CACHE_SIZE': (int, 256),
+    'PAGE_CACHE_TTL': (int, 300),
+    'FRAGMENT_CACHE_SIZE': (int, 10000),
+    'FRAGMENT_CACHE_TTL': (int, 60),
+    'PASSWORD_HASH_METHOD': (str, DEFAULT_METHOD),
+    # None means one worker per CPU and four queued hashes per worker
+    'PASSWORD_HASH_WORKERS': (int, None),
+    'PASSWORD_HASH_MAX_PENDING': (int, None),
+    'DIRECTORY_HORIZON_DAYS': (int, 60),
+    'DIRECTORY_CHECK_INTERVAL': (float, 60),
+}
+
+
+def services_config(environ=os.environ):
+    return {name: parse(environ[name]) if environ.get(name) else default
+            for name, (parse, default) in SETTINGS.items()}
+
+
+# Each upstream service gets its own bounded pool so a slow one cannot starve the others
+gemini_calls = Dependency('gemini')
+translator_calls = Dependency('translator')
+twilio_calls = Dependency('twilio')
+
+translator = Translator(TranslationCache(), dependency=translator_calls)
+
+# Chat turns are stored in English, the language the model is prompted in
+chat_log = ChatHistoryBuffer()
+conversation_context = ConversationContext()
+# Answers keyed on the English prompt, shared by near-duplicate questions
+response_cache = ResponseCache()
+cache_lookups.track('response', response_cache.stats,
+                    {'exact_hit': 'exact_hits', 'near_hit': 'near_hits', 'miss': 'misses'})
+cache_lookups.track('translation', translator.cache.stats, {'hit': 'hits', 'disk_hit': 'disk_hits', 'miss': 'misses'})
+
+# Failed logins are limited before any password hashing is done
+login_throttle = LoginThrottle()
+
+# Anonymous renders of the static pages, revalidated with ETags
+page_cache = PageCache()
+# Rendered dashboard appointment tables, dropped when the rows they show change
+fragment_cache = FragmentCache()
+
+
+def init_services(app):
+    """Size the shared helpers above, the password hasher and the doctor directory from ``app.config``."""
+    config = app.config
+    for dependency, prefix in ((gemini_calls, 'GEMINI'), (translator_calls, 'TRANSLATOR'), (twilio_calls, 'TWILIO')):
+        dependency.configure(max_concurrency=config[f'{prefix}_MAX_CONCURRENCY'],
+                             max_queue=config[f'{prefix}_MAX_QUEUE'], timeout=config[f'{prefix}_TIMEOUT'])
+    translator.cache.configure(max_entries=config['TRANSLATION_CACHE_SIZE'], ttl=config['TRANSLATION_CACHE_TTL'],
+                               db_path=config['TRANSLATION_CACHE_DB'])
+    chat_log.configure(flush_size=config['CHAT_HISTORY_FLUSH_SIZE'],
+                       flush_interval=config['CHAT_HISTORY_FLUSH_INTERVAL'],
+                       max_retries=config['CHAT_HISTORY_MAX_RETRIES'])
+    conversation_context.configure(token_budget=config['CHAT_CONTEXT_TOKEN_BUDGET'],
+                                   max_turns=config['CHAT_CONTEXT_MAX_TURNS'], max_age=config['CHAT_CONTEXT_MAX_AGE'])
+    response_cache.configure(max_entries=config['RESPONSE_CACHE_SIZE'], ttl=config['RESPONSE_CACHE_TTL'],
+                             threshold=config['RESPONSE_CACHE_THRESHOLD'])
+    login_throttle.configure(max_per_ip=config['LOGIN_MAX_ATTEMPTS_PER_IP'],
+                             max_per_email=config['LOGIN_MAX_ATTEMPTS_PER_EMAIL'],
+                             window=config['LOGIN_ATTEMPT_WINDOW'])
+    page_cache.configure(max_entries=config['PAGE_CACHE_SIZE'], ttl=config['PAGE_CACHE_TTL'])
+    fragment_cache.configure(max_entries=config['FRAGMENT_CACHE_SIZE'], ttl=config['FRAGMENT_CACHE_TTL'])
+    hasher.configure(method=config['PASSWORD_HASH_METHOD'], workers=config['PASSWORD_HASH_WORKERS'],
+                     max_pending=config['PASSWORD_HASH_MAX_PENDING'])
+    doctor_directory.configure(horizon_days=config['DIRECTORY_HORIZON_DAYS'],
+                               check_interval=config['DIRECTORY_CHECK_INTERVAL'])
+
+
+def dashboard_tags(instance):
+    if isinstance(instance, Appointment):
+        return [('user', instance.user_id), ('doctor', instance.doctor_id)]
+    if isinstance(instance, Doctor):
+        # Patient tables show the doctor's name, so a rename reaches every patient fragment; has_changes()
+        # because the old name is usually not loaded, which leaves history.deleted empty
+        if inspect(instance).attrs.name.history.has_changes():
+            return [('doctor', instance.id), ('patients',)]
+        return [('doctor', instance.id)]
+    return []
+
+
+fragment_cache.watch(dashboard_tags)
+# Keeps doctor_summary in step with appointments and doctor edits
+doctor_directory.watch()
+
+generation_config = {
+    "temperature": 0.2,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": 65536,
+    "response_mime_type": "text/plain",
+}
+
+system_instruction = """
+    You are a supportive AI assistant for pregnant women on the SheWell platform. Provide helpful, accurate information about pregnancy, but always recommend consulting with their doctor.
+
+-Don't respond to irrelevant question
+-Don't give inaccurate answers, you may skip if you are unsure
+"""
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def _build_gemini_model():
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv('GEMINI_API_KEY') or 'your_api_key_here')  # Replace with your API key
+    return genai.GenerativeModel(
+        model_name='gemini-2.0-flash',
+        generation_config=generation_config,
+        system_instruction=system_instruction
+    )
+
+
+def get_gemini_model():
+    return _client('gemini', _build_gemini_model)
+
+
+def twilio_configured():
+    return bool(os.getenv('TWILIO_ACCOUNT_SID') and os.getenv('TWILIO_AUTH_TOKEN') and os.getenv('TWILIO_PHONE_NUMBER'))
+
+
+def get_twilio_client():
+    def build():
+        from twilio.rest import Client
+        return Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
+    return _client('twilio', build)
+
+
+def sms_enabled():
+    """Whether bookings should queue SMS; checked without building a client."""
+    return os.getenv('SMS_BACKEND') == 'fake' or twilio_configured()
+
+
+def get_sms_sender():
+    if os.getenv('SMS_BACKEND') == 'fake':
+        return _client('sms', lambda: FakeSender(latency=float(os.getenv('FAKE_SMS_LATENCY', 0))))
+    if twilio_configured():
+        return _client('sms', lambda: TwilioSender(
+            get_twilio_client(), os.getenv('TWILIO_PHONE_NUMBER'), dependency=twilio_calls))
+    return None
@@ -0,0 +1,132 @@
+import threading
+import time as time_module
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Appointment
+
+SLOT_MINUTES = 30
+DAY_START = 9 * 60
+DAY_END = 17 * 60
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def parse_time(value):
+    """Return minutes since midnight for "HH:MM", "HH:MM:SS" or "h:MM AM" strings."""
+    value = (value or '').strip().upper()
+    for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p', '%I %p'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute
+    raise ValueError(f'Unrecognised time "{value}"')
+
+
+def format_slot(slot):
+    return f'{slot // 60:02d}:{slot % 60:02d}'
+
+
+def day_slots():
+    return list(range(DAY_START, DAY_END, SLOT_MINUTES))
+
+
+def slot_index(slot):
+    if slot < DAY_START or slot >= DAY_END or (slot - DAY_START) % SLOT_MINUTES:
+        return None
+    return (slot - DAY_START) // SLOT_MINUTES
+
+
+class SlotOccupancy:
+    """Per (doctor, day) bitmask of taken slots, loaded with one indexed query and kept briefly.
+
+    The cache only speeds up listing free slots; double bookings are prevented
+    by the unique constraint on (doctor_id, date, slot), so a stale entry can
+    at worst offer a slot that reserve_slot() then rejects.
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, doctor_id, day):
+        taken = 0
+        rows = db.session.query(Appointment.slot).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.date == day,
+            Appointment.slot.isnot(None)
+        )
+        for (slot,) in rows:
+            index = slot_index(slot)
+            if index is not None:
+                taken |= 1 << index
+        return taken
+
+    def taken(self, doctor_id, day):
+        key = (doctor_id, day)
+        now = time_module.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                return entry[0]
+        taken = self._load(doctor_id, day)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (taken, now)
+        return taken
+
+    def mark(self, doctor_id, day, slot):
+        index = slot_index(slot)
+        with self._lock:
+            entry = self._entries.get((doctor_id, day))
+            if entry and index is not None:
+                self._entries[(doctor_id, day)] = (entry[0] | 1 << index, entry[1])
+
+    def invalidate(self, doctor_id, day):
+        with self._lock:
+            self._entries.pop((doctor_id, day), None)
+
+
+occupancy = SlotOccupancy()
+
+
+def slot_has_started(day, slot, now=None):
+    """True once ``slot`` on ``day`` has begun, in the server's local time."""
+    now = now or datetime.now()
+    return (day, slot) <= (now.date(), now.hour * 60 + now.minute)
+
+
+def free_slots(doctor_id, day, now=None):
+    now = now or datetime.now()
+    taken = occupancy.taken(doctor_id, day)
+    return [slot for index, slot in enumerate(day_slots())
+            if not taken & (1 << index) and not slot_has_started(day, slot, now)]
+
+
+def reserve_slot(user_id, doctor_id, day, slot, commit=True, now=None):
+    """Insert the appointment or raise SlotUnavailable; the database decides who wins a race."""
+    if slot_index(slot) is None:
+        raise SlotUnavailable(f'{format_slot(slot)} is not a bookable slot')
+    if slot_has_started(day, slot, now):
+        raise SlotUnavailable(f'{format_slot(slot)} on {day:%b %d, %Y} has already passed')
+
+    appointment = Appointment(user_id=user_id, doctor_id=doctor_id, date=day, slot=slot, time=format_slot(slot))
+    db.session.add(appointment)
+    try:
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        occupancy.invalidate(doctor_id, day)
+        raise SlotUnavailable(f'{format_slot(slot)} on {day:%b %d, %Y} is already booked')
+    occupancy.mark(doctor_id, day, slot)
+    return appointment
@@ -0,0 +1,168 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+from models import db, SmsOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class TwilioSender:
+    def __init__(self, client, from_number, dependency=None):
+        self.client = client
+        self.from_number = from_number
+        self.dependency = dependency
+
+    def send(self, to, body):
+        if self.dependency:
+            return self.dependency.call(self.client.messages.create, body=body, from_=self.from_number, to=to)
+        return self.client.messages.create(body=body, from_=self.from_number, to=to)
+
+
+class FakeSender:
+    """Local stand-in for Twilio that records messages, with optional latency and failures."""
+
+    def __init__(self, latency=0.0, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.sent = []
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self._calls += 1
+            if self.fail_every and self._calls % self.fail_every == 0:
+                raise RuntimeError('Simulated SMS failure')
+            self.sent.append((to, body))
+
+
+def enqueue_sms(to, body, appointment_id=None, send_at=None):
+    """Add a message to the outbox in the caller's transaction; it is only sent once that commits.
+
+    ``send_at`` (UTC) holds the message back until then, e.g. for reminders.
+    """
+    message = SmsOutbox(to=to, body=body, appointment_id=appointment_id, next_attempt_at=send_at or datetime.utcnow())
+    db.session.add(message)
+    return message
+
+
+class SmsDispatcher:
+    """Drains the outbox in batches with retries, exponential backoff and a send rate limit.
+
+    Rows are claimed with a conditional UPDATE so several dispatchers can run
+    at once; a claim that is not finished within ``lease`` seconds (for
+    example because the worker died) is picked up again. ``lease`` should
+    comfortably exceed the time one send can take (the Twilio timeout plus
+    the rate-limit interval), since a batch stops sending at half of it.
+    """
+
+    def __init__(self, sender, batch_size=50, max_attempts=5, base_delay=30, max_delay=3600,
+                 rate_per_second=10, lease=300):
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_interval = 1.0 / rate_per_second if rate_per_second else 0
+        self.lease = lease
+        self._last_send = 0.0
+
+    def claim_batch(self):
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(SmsOutbox.status == 'pending', SmsOutbox.next_attempt_at <= now),
+            and_(SmsOutbox.status == 'sending', SmsOutbox.claimed_at < now - timedelta(seconds=self.lease)),
+        )
+        ids = [row.id for row in db.session.query(SmsOutbox.id)
+               .filter(claimable)
+               .order_by(SmsOutbox.next_attempt_at)
+               .limit(self.batch_size)]
+        if not ids:
+            return []
+
+        token = uuid.uuid4().hex
+        db.session.query(SmsOutbox).filter(SmsOutbox.id.in_(ids), claimable).update(
+            {'status': 'sending', 'claim_token': token, 'claimed_at': now},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return SmsOutbox.query.filter_by(claim_token=token, status='sending').all()
+
+    def _throttle(self):
+        wait = self._last_send + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_send = time.monotonic()
+
+    def _backoff(self, attempts):
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def _finish(self, message_id, token, values):
+        """Record the outcome of one send, unless the claim has since expired and passed to another worker."""
+        updated = db.session.query(SmsOutbox).filter(
+            SmsOutbox.id == message_id, SmsOutbox.claim_token == token
+        ).update(dict(values, claim_token=None), synchronize_session=False)
+        db.session.commit()
+        if not updated:
+            logger.warning(f"Lost the claim on SMS {message_id} before recording its outcome")
+        return bool(updated)
+
+    def _release(self, message_ids, token):
+        """Hand unsent messages back to the queue without counting an attempt."""
+        db.session.query(SmsOutbox).filter(
+            SmsOutbox.id.in_(message_ids), SmsOutbox.claim_token == token
+        ).update({'status': 'pending', 'claim_token': None}, synchronize_session=False)
+        db.session.commit()
+
+    def dispatch_batch(self):
+        messages = self.claim_batch()
+        if not messages:
+            return 0, 0
+        token = messages[0].claim_token
+        # Read up front; the per-message commits below would otherwise reload every row
+        batch = [(message.id, message.to, message.body, message.attempts) for message in messages]
+        started = time.monotonic()
+        sent = 0
+        # Each outcome is committed as soon as it is known, and only while this worker still holds the
+        # claim; the rest of a slow batch is released at half the lease so it is never reclaimed mid-send
+        for index, (message_id, to, body, attempts) in enumerate(batch):
+            if time.monotonic() - started > self.lease / 2:
+                logger.warning(f"Releasing {len(messages) - index} unsent SMS messages; the batch is close to its lease")
+                self._release([row[0] for row in batch[index:]], token)
+                break
+            self._throttle()
+            attempts += 1
+            try:
+                self.sender.send(to, body)
+            except Exception as e:
+                values = {'attempts': attempts, 'last_error': str(e)[:500]}
+                if attempts >= self.max_attempts:
+                    values['status'] = 'failed'
+                    logger.error(f"Giving up on SMS {message_id} after {attempts} attempts: {e}")
+                else:
+                    values['status'] = 'pending'
+                    values['next_attempt_at'] = datetime.utcnow() + self._backoff(attempts)
+                self._finish(message_id, token, values)
+            else:
+                if self._finish(message_id, token, {'attempts': attempts, 'status': 'sent', 'sent_at': datetime.utcnow()}):
+                    sent += 1
+        return len(messages), sent
+
+    def run(self, idle_sleep=2.0, once=False):
+        while True:
+            claimed, sent = self.dispatch_batch()
+            if claimed:
+                logger.info(f"Dispatched {sent}/{claimed} SMS messages")
+            if once and not claimed:
+                return
+            if not claimed:
+                time.sleep(idle_sleep)
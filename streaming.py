@@ -0,0 +1,40 @@
+import json
+import re
+
+# Sentence ends: Latin punctuation plus the Devanagari danda used by several supported languages
+SENTENCE_END = re.compile(r'(?<=[.!?।])\s+|\n+')
+
+
+def iter_sentences(fragments, min_length=40):
+    """Regroup streamed text fragments into sentence-sized chunks.
+
+    Short sentences are merged until at least ``min_length`` characters are
+    buffered so each chunk is worth a translation round-trip.
+    """
+    buffer = ''
+    for fragment in fragments:
+        if not fragment:
+            continue
+        buffer += fragment
+        parts = SENTENCE_END.split(buffer)
+        # The last part has no terminator yet and may still grow
+        complete, buffer = parts[:-1], parts[-1]
+        pending = ''
+        for sentence in complete:
+            if not sentence.strip():
+                continue
+            pending = f'{pending} {sentence}' if pending else sentence
+            if len(pending) >= min_length:
+                yield pending
+                pending = ''
+        if pending:
+            buffer = f'{pending} {buffer}'
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def sse_event(data, event=None):
+    payload = f'data: {json.dumps(data)}\n\n'
+    if event:
+        payload = f'event: {event}\n{payload}'
+    return payload
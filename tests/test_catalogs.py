@@ -0,0 +1,45 @@
+import gettext
+
+import pytest
+
+from catalogs import read_mo, write_mo
+
+MESSAGES = {
+    'Book Appointment': 'अपॉइंटमेंट बुक करें',
+    'Doctors': 'डॉक्टर',
+    # Entries with a context, as gettext stores them
+    'menu\x04Doctors': 'डॉक्टरों की सूची',
+    ('%(num)d appointment', '%(num)d appointments'): ('%(num)d अपॉइंटमेंट', '%(num)d अपॉइंटमेंट्स'),
+    ('Zebra', 'Zebras'): ('ज़ेबरा', 'ज़ेबरे'),
+}
+
+
+@pytest.fixture
+def mo_path(tmp_path):
+    path = str(tmp_path / 'hi.mo')
+    write_mo(path, MESSAGES)
+    return path
+
+
+def test_gnu_translations_reads_written_catalog(mo_path):
+    with open(mo_path, 'rb') as f:
+        translations = gettext.GNUTranslations(f)
+    assert translations.info()['language'] == 'hi'
+    assert translations.gettext('Book Appointment') == 'अपॉइंटमेंट बुक करें'
+    assert translations.gettext('Doctors') == 'डॉक्टर'
+    assert translations.pgettext('menu', 'Doctors') == 'डॉक्टरों की सूची'
+    assert translations.ngettext('%(num)d appointment', '%(num)d appointments', 1) == '%(num)d अपॉइंटमेंट'
+    assert translations.ngettext('%(num)d appointment', '%(num)d appointments', 3) == '%(num)d अपॉइंटमेंट्स'
+    assert translations.ngettext('Zebra', 'Zebras', 2) == 'ज़ेबरे'
+    assert translations.gettext('Missing') == 'Missing'
+
+
+def test_read_mo_round_trips(mo_path):
+    assert read_mo(mo_path) == MESSAGES
+
+
+def test_read_mo_rejects_other_files(tmp_path):
+    path = tmp_path / 'broken.mo'
+    path.write_bytes(b'\0' * 28)
+    with pytest.raises(ValueError):
+        read_mo(str(path))
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from models import db, User, Doctor, Appointment
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.delenv('DATABASE_READ_URL', raising=False)
+    app = create_app({'TESTING': True})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def make_patient(email):
+    return User(email=email, name='Patient', phone='5550100')
+
+
+def make_doctor(email):
+    return Doctor(email=email, name='Doctor', specialization='Gynecology', experience=5, phone='5550101',
+                  available_days='Mon,Tue,Wed,Thu,Fri')
+
+
+def seed_pair(index, count):
+    """A patient and a doctor with ``count`` appointments each, half upcoming and half past.
+
+    Every appointment is with a different counterpart, so loading them lazily
+    would cost one query per row.
+    """
+    patient = make_patient(f'patient{index}@example.com')
+    doctor = make_doctor(f'doctor{index}@example.com')
+    others = [(make_patient(f'patient{index}.{n}@example.com'), make_doctor(f'doctor{index}.{n}@example.com'))
+              for n in range(count)]
+    db.session.add_all([patient, doctor, *(person for pair in others for person in pair)])
+    db.session.flush()
+    today = date.today()
+    rows = []
+    for n, (other_patient, other_doctor) in enumerate(others):
+        day = today + timedelta(days=n if n % 2 else -n - 1)
+        rows.append({'user_id': patient.id, 'doctor_id': other_doctor.id, 'date': day, 'time': '10:00',
+                     'slot': 600, 'status': 'scheduled'})
+        rows.append({'user_id': other_patient.id, 'doctor_id': doctor.id, 'date': day, 'time': '10:00',
+                     'slot': 600, 'status': 'scheduled'})
+    db.session.execute(db.insert(Appointment), rows)
+    db.session.commit()
+    return patient.id, doctor.id
+
+
+def count_queries(app, user_type, user_id, path):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_type'] = user_type
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('user_type, path', [
+    ('patient', '/patient_dashboard'),
+    ('patient', '/patient_dashboard?when=past'),
+    ('doctor', '/doctor_dashboard'),
+    ('doctor', '/doctor_dashboard?when=past'),
+])
+def test_dashboard_query_count_does_not_grow_with_appointments(app, user_type, path):
+    # Each pair has its own ids, so neither request is served from the other's cached table
+    small = seed_pair(1, 2)
+    large = seed_pair(2, 60)
+    owner = 0 if user_type == 'patient' else 1
+    assert count_queries(app, user_type, small[owner], path) == count_queries(app, user_type, large[owner], path)
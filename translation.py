@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationCache:
+    """Bounded in-process LRU with an optional SQLite tier shared by all workers."""
+
+    def __init__(self, max_entries=2048, ttl=7 * 24 * 3600, db_path=None):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.configure(max_entries, ttl, db_path)
+
+    def configure(self, max_entries=2048, ttl=7 * 24 * 3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._local = threading.local()
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS translation_cache ('
+                    'key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)'
+                )
+
+    @staticmethod
+    def make_key(text, target_language, source_language='auto'):
+        digest = hashlib.sha256(f'{source_language}\0{text}'.encode('utf-8')).hexdigest()
+        return f'{digest}:{target_language}'
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.db_path:
+            try:
+                row = self._connect().execute(
+                    'SELECT value, created_at FROM translation_cache WHERE key = ? AND created_at > ?',
+                    (key, now - self.ttl)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Translation cache read error: {e}")
+                row = None
+            if row:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.disk_hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        now = time.time()
+        self._remember(key, value, now)
+        if not self.db_path:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO translation_cache (key, value, created_at) VALUES (?, ?, ?)',
+                    (key, value, now)
+                )
+                self._writes += 1
+                # Expired rows are swept occasionally rather than on every write
+                if self._writes % 500 == 0:
+                    conn.execute('DELETE FROM translation_cache WHERE created_at <= ?', (now - self.ttl,))
+        except sqlite3.Error as e:
+            logger.error(f"Translation cache write error: {e}")
+
+    def _remember(self, key, value, created_at):
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+class Translator:
+    """Reuses one GoogleTranslator per language pair and calling thread, backed by a TranslationCache.
+
+    When a ``dependency`` (see outbound.Dependency) is given, cache misses are
+    sent through it so translation calls are bounded and time out.
+    """
+
+    def __init__(self, cache=None, dependency=None):
+        self.cache = cache or TranslationCache()
+        self.dependency = dependency
+        self._local = threading.local()
+
+    def _client(self, source_language, target_language):
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        pair = (source_language, target_language)
+        if pair not in clients:
+            # Imported on first use so workers that never translate don't pay for it
+            from deep_translator import GoogleTranslator
+            clients[pair] = GoogleTranslator(source=source_language, target=target_language)
+        return clients[pair]
+
+    def _translate(self, source_language, target_language, text):
+        # Runs on whichever thread makes the call, so a pool call abandoned after a timeout keeps
+        # using its own pool thread's client and never shares one with a later request
+        return self._client(source_language, target_language).translate(text)
+
+    def translate(self, text, target_language='en', source_language='auto'):
+        if not text or not text.strip() or source_language == target_language:
+            return text
+
+        key = self.cache.make_key(text, target_language, source_language)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            if self.dependency:
+                translated = self.dependency.call(self._translate, source_language, target_language, text)
+            else:
+                translated = self._translate(source_language, target_language, text)
+        except Exception as e:
+            logger.error(f"Translation error: {e}")
+            return text
+        if translated:
+            self.cache.set(key, translated)
+            return translated
+        return text
+
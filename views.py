@@ -0,0 +1,622 @@
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, session, Response, stream_with_context
+from markupsafe import Markup
+from models import db, User, Doctor
+from datetime import date, datetime
+import json
+import math
+import random
+import tempfile
+from streaming import iter_sentences, sse_event
+from outbound import OutboundError
+from passwords import HashingBusyError
+from doctor_search import search_doctors, doctor_to_dict, InvalidCursor
+from slots import free_slots, format_slot, parse_time, reserve_slot, SlotUnavailable
+from dashboards import patient_appointments, doctor_appointments
+from sms import enqueue_sms
+from doctor_import import DoctorImporter, ImportFormatError, detect_format, iter_records
+from exports import FORMATS as EXPORT_FORMATS, appointment_rows, chat_history_rows, encode
+from reminders import schedule_reminders
+from cycles import prediction_for, recent_periods, record_period
+from catalogs import N_, gettext, lookup
+from services import (chat_log, conversation_context, doctor_directory, fragment_cache, gemini_calls, get_gemini_model,
+                      login_throttle, page_cache, response_cache, sms_enabled, translator)
+
+bp = Blueprint('main', __name__)
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def admin_authorized():
+    # Admin endpoints are only enabled when an admin token is configured
+    token = current_app.config.get('ADMIN_TOKEN')
+    return bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+
+def login_required(user_type=None):
+    if 'user_id' not in session:
+        flash('Please log in to access this page', 'error')
+        return redirect(url_for('main.login'))
+    if user_type and session.get('user_type') != user_type:
+        flash(f'You must be logged in as a {user_type} to access this page', 'error')
+        return redirect(url_for('main.dashboard'))
+    return None
+
+@bp.route('/')
+@page_cache.cached
+def home():
+    return render_template('index.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        user_type = request.form.get('user_type')
+
+        retry_after = login_throttle.retry_after(request.remote_addr, email)
+        if retry_after:
+            flash(f'Too many login attempts. Please try again in {math.ceil(retry_after / 60)} minute(s).', 'error')
+            return render_template('login.html'), 429
+
+        user = User.query.filter_by(email=email).first() if user_type == 'patient' else Doctor.query.filter_by(email=email).first()
+
+        try:
+            authenticated = user is not None and user.check_password(password)
+        except HashingBusyError:
+            flash('We are handling a lot of logins right now. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503
+
+        if authenticated:
+            login_throttle.reset(email)
+            db.session.commit()  # Persists a rehashed password, if check_password upgraded it
+            session['user_id'] = user.id
+            session['user_type'] = user_type
+            session['name'] = user.name  # Store name in session
+            flash('Login successful!', 'success')
+            return redirect(url_for('main.dashboard'))
+
+        login_throttle.record_failure(request.remote_addr, email)
+        flash('Invalid email or password', 'error')
+    return render_template('login.html')
+
+@bp.route('/register')
+@page_cache.cached
+def register():
+    return render_template('register.html')
+
+@bp.route('/periods')
+@page_cache.cached
+def periods():
+    if session.get('user_type') != 'patient':
+        return render_template('periods.html')
+    user_id = session['user_id']
+    return render_template('periods.html', prediction=prediction_for(user_id), history=recent_periods(user_id),
+                           today=date.today())
+
+@bp.route('/periods/log', methods=['POST'])
+def log_period():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return redirect_result
+    try:
+        start_date = parse_date(request.form.get('start_date'))
+    except (TypeError, ValueError):
+        flash('Please choose a valid date', 'error')
+        return redirect(url_for('main.periods'))
+    if start_date > date.today():
+        flash('Period start dates cannot be in the future', 'error')
+    elif record_period(session['user_id'], start_date):
+        flash('Period logged. Your predictions have been updated.', 'success')
+    else:
+        flash('That date is already logged', 'info')
+    return redirect(url_for('main.periods'))
+
+@bp.route('/api/cycle')
+def api_cycle():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return jsonify({'error': 'Unauthorized'}), 401
+    prediction = prediction_for(session['user_id'])
+    if prediction is None:
+        return jsonify({'prediction': None})
+    return jsonify({'prediction': {
+        'cycle_count': prediction.cycle_count,
+        'mean_length': prediction.mean_length,
+        'std_length': prediction.std_length,
+        'last_start': prediction.last_start.isoformat(),
+        'next_start': prediction.next_start.isoformat(),
+        'fertile_start': prediction.fertile_start.isoformat(),
+        'fertile_end': prediction.fertile_end.isoformat(),
+    }})
+
+@bp.route("/mental-health")
+def mental_health():
+    quotes = [
+        N_("This too shall pass."), N_("You are stronger than you think."),
+        N_("Breathe in courage, breathe out fear."), N_("One day at a time."),
+        N_("You are enough just as you are."), N_("The sun will rise, and so will you.")
+    ]
+    return render_template("mental_health.html", quote=gettext(random.choice(quotes)))
+
+@bp.route('/reels')
+@page_cache.cached
+def reels():
+    return render_template("reels.html")
+
+@bp.route("/about")
+@page_cache.cached
+def about():
+    return render_template("about.html")
+
+@bp.route('/register_patient', methods=['POST'])
+def register_patient():
+    name = request.form.get('name')
+    email = request.form.get('email')
+    phone = request.form.get('phone')
+    password = request.form.get('password')
+
+    if User.query.filter_by(email=email).first():
+        flash('Email is already registered', 'error')
+        return redirect(url_for('main.register'))
+
+    new_user = User(name=name, email=email, phone=phone)
+    try:
+        new_user.set_password(password)
+    except HashingBusyError:
+        flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'error')
+        return redirect(url_for('main.register'))
+    db.session.add(new_user)
+    db.session.commit()
+
+    flash('Patient registered successfully! Please log in.', 'success')
+    return redirect(url_for('main.login'))
+
+@bp.route('/register_doctor', methods=['POST'])
+def register_doctor():
+    name = request.form.get('name')
+    email = request.form.get('email')
+    phone = request.form.get('phone')
+    specialization = request.form.get('specialization')
+    password = request.form.get('password')
+    per_minute_price = request.form.get('per_minute_price', type=float)
+
+    if Doctor.query.filter_by(email=email).first():
+        flash('Email is already registered', 'error')
+        return redirect(url_for('main.register'))
+
+    new_doctor = Doctor(
+        name=name,
+        email=email,
+        phone=phone,
+        specialization=specialization,
+        experience=request.form.get('experience', 0, type=int),
+        per_minute_price=per_minute_price
+    )
+    try:
+        new_doctor.set_available_days(request.form.get('available_days', 'Mon-Fri'))
+    except ValueError:
+        flash('Please enter available days like "Mon-Fri" or "Mon, Wed, Fri"', 'error')
+        return redirect(url_for('main.register'))
+    try:
+        new_doctor.set_password(password)
+    except HashingBusyError:
+        flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'error')
+        return redirect(url_for('main.register'))
+    db.session.add(new_doctor)
+    db.session.commit()
+
+    flash('Doctor registered successfully! Please log in.', 'success')
+    return redirect(url_for('main.login'))
+
+@bp.route('/dashboard')
+def dashboard():
+    if 'user_id' not in session or 'user_type' not in session:
+        flash('Please log in to access this page', 'error')
+        return redirect(url_for('main.login'))
+    
+    if session['user_type'] == 'patient':
+        return redirect(url_for('main.patient_dashboard'))
+    elif session['user_type'] == 'doctor':
+        return redirect(url_for('main.doctor_dashboard'))
+    else:
+        flash('Invalid user type', 'error')
+        return redirect(url_for('main.login'))
+
+def appointments_table(owner_type, owner_id, tags, load_page):
+    when = request.args.get('when', 'upcoming')
+    page_number = request.args.get('page', 1, type=int)
+    # Today is part of the key because it decides which appointments are upcoming
+    key = (owner_type, owner_id, when, page_number, date.today())
+
+    def render():
+        page = load_page(owner_id, when, page_number)
+        return render_template(f'{owner_type}_appointments.html', appointments=page.items, page=page)
+
+    return Markup(fragment_cache.fetch(key, tags, render))
+
+@bp.route('/patient_dashboard')
+def patient_dashboard():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return redirect_result
+
+    user = User.query.get(session['user_id'])
+    table = appointments_table('patient', user.id, [('user', user.id), ('patients',)], patient_appointments)
+    return render_template('patient_dashboard.html', user=user, appointments_table=table,
+                           prediction=prediction_for(user.id))
+
+@bp.route('/doctor_dashboard', methods=['GET', 'POST'])
+def doctor_dashboard():
+    try:
+        # Verify user is logged in as doctor
+        if 'user_id' not in session or session.get('user_type') != 'doctor':
+            flash('Please login as a doctor first', 'error')
+            return redirect(url_for('main.login'))
+
+        # Get doctor from database
+        doctor = Doctor.query.get(session['user_id'])
+        if not doctor:
+            flash('Doctor profile not found', 'error')
+            return redirect(url_for('main.login'))
+
+        # Handle price update
+        if request.method == 'POST':
+            new_price = request.form.get('per_minute_price', type=float)
+            if new_price is not None:
+                doctor.per_minute_price = new_price
+                db.session.commit()
+                flash('Price updated successfully!', 'success')
+
+        # Get one page of appointments with their patients joined in, or its cached rendering
+        table = appointments_table('doctor', doctor.id, [('doctor', doctor.id)], doctor_appointments)
+        
+        # Render template with all required variables
+        return render_template('doctor_dashboard.html',
+                            doctor=doctor,
+                            appointments_table=table,
+                            current_time=datetime.now())  # Pass current time
+
+    except Exception as e:
+        current_app.logger.error(f"Dashboard error: {str(e)}")
+        flash('Failed to load dashboard', 'error')
+        return redirect(url_for('main.home'))
+@bp.route('/logout')
+def logout():
+    session.clear()
+    flash('You have been logged out', 'info')
+    return redirect(url_for('main.home'))
+
+@bp.route('/doctors')
+def doctors():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return redirect_result
+    # The page always renders the first page; later pages come from /api/doctors
+    search_args = doctor_search_args()
+    search_args['cursor'] = None
+    doctor_directory.refresh_stale()
+    doctors_list, next_cursor = search_doctors(**search_args)
+    return render_template('doctors.html', doctors=doctors_list, next_cursor=next_cursor, filters=request.args)
+
+def doctor_search_args():
+    return {
+        'specialization': request.args.get('specialization') or None,
+        'day': request.args.get('day') or None,
+        'date': request.args.get('date', type=parse_date),
+        'min_experience': request.args.get('min_experience', type=int),
+        'min_price': request.args.get('min_price', type=float),
+        'max_price': request.args.get('max_price', type=float),
+        'sort': request.args.get('sort', 'name'),
+        'cursor': request.args.get('cursor') or None,
+        'limit': request.args.get('limit', type=int),
+    }
+
+@bp.route('/api/doctors')
+def api_doctors():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return jsonify({'error': 'Unauthorized'}), 401
+    doctor_directory.refresh_stale()
+    try:
+        doctors_list, next_cursor = search_doctors(**doctor_search_args())
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({
+        'doctors': [doctor_to_dict(doctor) for doctor in doctors_list],
+        'next_cursor': next_cursor,
+    })
+
+@bp.route('/book_appointment/<int:doctor_id>', methods=['GET', 'POST'])
+def book_appointment(doctor_id):
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return redirect_result
+
+    doctor = Doctor.query.get_or_404(doctor_id)
+
+    if request.method == 'POST':
+        date = request.form.get('date')
+        time = request.form.get('time')
+
+        try:
+            appointment_date = parse_date(date)
+        except (TypeError, ValueError):
+            flash('Please choose a valid date', 'error')
+            return render_template('book_appointment.html', doctor=doctor)
+        if not doctor.is_available_on(appointment_date):
+            flash(f'Dr. {doctor.name} is not available on {appointment_date.strftime("%A")}s ({doctor.available_days})', 'error')
+            return render_template('book_appointment.html', doctor=doctor)
+        if appointment_date < datetime.now().date():
+            flash('Please choose a date in the future', 'error')
+            return render_template('book_appointment.html', doctor=doctor)
+
+        try:
+            appointment = reserve_slot(session['user_id'], doctor_id, appointment_date, parse_time(time), commit=False)
+        except ValueError:
+            flash('Please choose a valid time', 'error')
+            return render_template('book_appointment.html', doctor=doctor)
+        except SlotUnavailable as e:
+            flash(f'{e}. Please choose another time.', 'error')
+            return render_template('book_appointment.html', doctor=doctor)
+
+        # The confirmation and reminders are queued in the same transaction as the appointment
+        if sms_enabled():
+            user = User.query.get(session['user_id'])
+            enqueue_sms(
+                user.phone,
+                f"Hello {user.name}, your appointment with Dr. {doctor.name} is confirmed for {date} at {appointment.time}.",
+                appointment_id=appointment.id
+            )
+            schedule_reminders(appointment)
+        db.session.commit()
+
+        flash('Appointment booked successfully!', 'success')
+        return redirect(url_for('main.dashboard'))
+
+    return render_template('book_appointment.html', doctor=doctor)
+
+@bp.route('/api/doctors/<int:doctor_id>/slots')
+def api_doctor_slots(doctor_id):
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    doctor = Doctor.query.get_or_404(doctor_id)
+    day = request.args.get('date', type=parse_date)
+    if day is None:
+        return jsonify({'error': 'A date in YYYY-MM-DD format is required'}), 400
+    if day < datetime.now().date() or not doctor.is_available_on(day):
+        return jsonify({'date': day.isoformat(), 'slots': []})
+    return jsonify({'date': day.isoformat(), 'slots': [format_slot(slot) for slot in free_slots(doctor_id, day)]})
+
+@bp.route('/chatbot')
+def chatbot():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return redirect_result
+    return render_template('chatbot.html')
+
+CHAT_NO_ANSWER = N_("I'm sorry, I couldn't process your request.")
+CHAT_BUSY = N_('The assistant is busy right now. Please try again in a moment.')
+CHAT_FAILED = N_('Sorry, I was unable to process your request. Please try again later.')
+
+def is_context_free(contents):
+    # Just the prompt itself: no turns from this patient's current conversation (see CHAT_CONTEXT_MAX_AGE)
+    return len(contents) == 1
+
+def translate_reply(text, language):
+    # Canned replies come precompiled; only model output needs a live translation
+    return lookup(text, language) or translator.translate(text, language, 'en')
+
+@bp.route('/api/chat', methods=['POST'])
+def chat():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({'error': 'Message is required'}), 400
+
+    user_message = data.get('message')
+    selected_language = data.get('language', 'en')
+
+    # English conversations never need a translation round-trip
+    source_language = 'en' if selected_language == 'en' else 'auto'
+
+    user_id = session['user_id']
+
+    try:
+        prompt = translator.translate(user_message, 'en', source_language)
+        contents = conversation_context.build(user_id, prompt)
+        # Answers shaped by a patient's earlier turns are theirs alone; only context-free ones are shared
+        shareable = is_context_free(contents)
+        ai_response = response_cache.get(prompt) if shareable else None
+        if ai_response is None:
+            response = gemini_calls.call(get_gemini_model().generate_content, contents)
+            if hasattr(response, 'text'):
+                ai_response = response.text.strip()
+                if shareable:
+                    response_cache.set(prompt, ai_response)
+            else:
+                ai_response = CHAT_NO_ANSWER
+        conversation_context.add_turn(user_id, prompt, ai_response)
+        chat_log.record(user_id, prompt, ai_response)
+        return jsonify({'response': translate_reply(ai_response, selected_language)})
+    except OutboundError as e:
+        current_app.logger.error(f"AI service unavailable: {e}")
+        return jsonify({'response': gettext(CHAT_BUSY, selected_language)}), 503
+    except Exception as e:
+        current_app.logger.error(f"Failed to generate AI response: {e}")
+        return jsonify({'response': gettext(CHAT_FAILED, selected_language)}), 500
+
+@bp.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    redirect_result = login_required('patient')
+    if redirect_result:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({'error': 'Message is required'}), 400
+
+    user_message = data.get('message')
+    selected_language = data.get('language', 'en')
+    source_language = 'en' if selected_language == 'en' else 'auto'
+    user_id = session['user_id']
+
+    def generate():
+        try:
+            prompt = translator.translate(user_message, 'en', source_language)
+            contents = conversation_context.build(user_id, prompt)
+            shareable = is_context_free(contents)
+            cached = response_cache.get(prompt) if shareable else None
+            if cached is not None:
+                conversation_context.add_turn(user_id, prompt, cached)
+                chat_log.record(user_id, prompt, cached)
+                yield sse_event({'text': translate_reply(cached, selected_language)})
+                yield sse_event({}, event='done')
+                return
+
+            chunks = gemini_calls.iterate(get_gemini_model().generate_content, contents, stream=True)
+            received = []
+
+            def fragments():
+                for chunk in chunks:
+                    if getattr(chunk, 'text', None):
+                        received.append(chunk.text)
+                        yield chunk.text
+
+            if selected_language == 'en':
+                # Nothing to translate, so forward tokens as soon as they arrive
+                for fragment in fragments():
+                    yield sse_event({'text': fragment})
+            else:
+                for sentence in iter_sentences(fragments()):
+                    yield sse_event({'text': translator.translate(sentence, selected_language, 'en') + ' '})
+
+            ai_response = ''.join(received).strip()
+            if ai_response:
+                if shareable:
+                    response_cache.set(prompt, ai_response)
+                conversation_context.add_turn(user_id, prompt, ai_response)
+                chat_log.record(user_id, prompt, ai_response)
+            yield sse_event({}, event='done')
+        except Exception as e:
+            current_app.logger.error(f"Failed to stream AI response: {e}")
+            yield sse_event({'error': gettext(CHAT_FAILED, selected_language)}, event='error')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@bp.route('/admin/add_doctor', methods=['GET', 'POST'])
+def add_doctor():
+    if request.method == 'POST':
+        name = request.form.get('name')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        specialization = request.form.get('specialization')
+        experience = request.form.get('experience')
+        phone = request.form.get('phone')
+        available_days = request.form.get('available_days')
+        per_minute_price = request.form.get('per_minute_price', type=float)
+
+        if Doctor.query.filter_by(email=email).first():
+            flash('Email already registered', 'error')
+            return render_template('admin_add_doctor.html')
+
+        doctor = Doctor(
+            name=name, email=email, specialization=specialization,
+            experience=experience, phone=phone, per_minute_price=per_minute_price
+        )
+        try:
+            doctor.set_available_days(available_days)
+        except ValueError:
+            flash('Please enter available days like "Mon-Fri" or "Mon, Wed, Fri"', 'error')
+            return render_template('admin_add_doctor.html')
+        try:
+            doctor.set_password(password)
+        except HashingBusyError:
+            flash('The server is busy hashing passwords. Please try again in a moment.', 'error')
+            return render_template('admin_add_doctor.html'), 503
+        db.session.add(doctor)
+        db.session.commit()
+        flash('Doctor added successfully!', 'success')
+        return redirect(url_for('main.home'))
+
+    return render_template('admin_add_doctor.html')
+
+@bp.route('/admin/doctors/import', methods=['POST'])
+def import_doctors():
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'Upload a CSV or JSONL file as "file"'}), 400
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    importer = DoctorImporter(batch_size=request.form.get('batch_size', 500, type=int))
+    # The upload is closed with the request, before a streamed body runs, so keep a private copy
+    source = tempfile.TemporaryFile()
+    upload.save(source)
+    source.seek(0)
+
+    def generate():
+        # One JSON line per committed batch so clients can follow progress through large files
+        try:
+            for report in importer.iter_batches(iter_records(source, fmt)):
+                yield json.dumps(dict(report.summary(), event='progress')) + '\n'
+        except ImportFormatError as e:
+            yield json.dumps({'event': 'error', 'error': str(e)}) + '\n'
+            return
+        finally:
+            source.close()
+        yield json.dumps(dict(report.to_dict(), event='done')) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def export_response(result, fmt, name):
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(stream_with_context(encode(result, fmt)), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+    })
+
+def export_date_range():
+    # Parsed by hand because request.args.get(type=...) would silently drop a bad date
+    start, end = request.args.get('start'), request.args.get('end')
+    return parse_date(start) if start else None, parse_date(end) if end else None
+
+@bp.route('/exports/appointments.<fmt>')
+def export_appointments(fmt):
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Format must be csv or jsonl'}), 404
+    # Doctors export their own appointments; the admin token can export anyone's
+    if admin_authorized():
+        doctor_id = request.args.get('doctor_id', type=int)
+    elif session.get('user_type') == 'doctor':
+        doctor_id = session['user_id']
+    else:
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        start, end = export_date_range()
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    return export_response(appointment_rows(doctor_id, start, end), fmt, 'appointments')
+
+@bp.route('/exports/chat_history.<fmt>')
+def export_chat_history(fmt):
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Format must be csv or jsonl'}), 404
+    # Patients export their own conversations; the admin token can export anyone's
+    if admin_authorized():
+        user_id = request.args.get('user_id', type=int)
+    elif session.get('user_type') == 'patient':
+        user_id = session['user_id']
+    else:
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        start, end = export_date_range()
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    return export_response(chat_history_rows(user_id, start, end), fmt, 'chat_history')